@@ -1,21 +1,72 @@
-﻿from flask import Flask, render_template, request, jsonify
+﻿from flask import Flask, render_template, request, jsonify, send_from_directory
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.utils import secure_filename
+from flask_compress import Compress
 import os
+import functools
+import gzip
+import hashlib
 import logging
-import json
-from datetime import datetime, timedelta
-import tempfile
-import subprocess
+import atexit
+import queue
 import shutil
-import sys
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
 import requests
-import re
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from threading import Lock, Thread
+from cachetools import TTLCache
+from concurrent.futures import Future, ThreadPoolExecutor
 import numpy as np
+import orjson
 import base64
 from urllib.parse import urlencode
 
 # Lazy import of WeatherMapGenerator to avoid heavy imports at module import time
 
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson.
+
+    Serializes numpy arrays/scalars natively and writes response bodies as bytes,
+    which matters for the large grid payloads returned by /get_variable_data.
+    Request bodies are parsed with orjson as well.
+    """
+
+    option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self.option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=self.option | orjson.OPT_APPEND_NEWLINE),
+            mimetype=self.mimetype,
+        )
+
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
+
+# Output directories, created once at startup rather than per request
+STATIC_MAPS_DIR = os.path.join(app.root_path, 'static', 'maps')
+LOGS_DIR = os.path.join(app.root_path, 'logs')
+os.makedirs(STATIC_MAPS_DIR, exist_ok=True)
+os.makedirs(LOGS_DIR, exist_ok=True)
+
+# Compress large JSON / HTML bodies (grid payloads, folium maps); small replies go out as-is
+app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+app.config['COMPRESS_MIN_SIZE'] = 4096
+app.config['COMPRESS_MIMETYPES'] = ['text/html', 'application/json', 'text/css', 'application/javascript']
+# Overlay payloads are mostly base64 PNG, which gains little from higher gzip levels
+app.config['COMPRESS_LEVEL'] = 4
+Compress(app)
 
 # Use an environment-provided secret in production; fallback to a random key for dev.
 secret = os.environ.get('FLASK_SECRET')
@@ -27,27 +78,47 @@ else:
 
 # Weather generator will be created lazily on first use to avoid heavy startup costs / import errors
 weather_generator = None
+_weather_generator_lock = Lock()
 
 def get_weather_generator():
-    """Lazily import and instantiate WeatherMapGenerator from `test.py`.
+    """Lazily import and instantiate WeatherMapGenerator from `weather_map.py`.
 
     This prevents the Flask app from failing to import when system deps for cfgrib / eccodes
-    are missing during quick code checks.
+    are missing during quick code checks. Creation is serialized so concurrent first requests
+    (or the warmup thread) share a single instance and its HTTP session / caches.
     """
     global weather_generator
     if weather_generator is None:
-        try:
-            # Import the class only when needed
-            sys.path.insert(0, os.path.dirname(__file__))
-            from test import WeatherMapGenerator
-            weather_generator = WeatherMapGenerator()
-        except Exception as e:
-            logging.getLogger(__name__).error(f'Failed to create WeatherMapGenerator: {e}', exc_info=True)
-            raise
+        with _weather_generator_lock:
+            if weather_generator is None:
+                try:
+                    # Import the class only when needed
+                    from weather_map import WeatherMapGenerator
+                    weather_generator = WeatherMapGenerator()
+                except Exception as e:
+                    logging.getLogger(__name__).error('Failed to create WeatherMapGenerator: %s', e, exc_info=True)
+                    raise
     return weather_generator
 
 
-from app_utils import date_to_yyyymmdd, validate_pressure_level
+def _preload_weather_generator():
+    try:
+        get_weather_generator()
+    except Exception:
+        pass  # already logged; the first request will retry
+
+
+# Import xarray/eccodes and build the generator in the background so the first request
+# doesn't pay the cold-start cost. Set WG_PRELOAD=0 to keep it fully lazy.
+if os.environ.get('WG_PRELOAD', '1') == '1':
+    Thread(target=_preload_weather_generator, daemon=True).start()
+
+
+from app_utils import (
+    closest_level, date_to_yyyymmdd, extract_pressure_levels, nearest_grid_index, parse_int, resample_to_grid,
+    validate_pressure_level,
+)
+from weather_config import WeatherMapConfig
 
 # Create weather map generator instance (created lazily by get_weather_generator)
 
@@ -55,6 +126,88 @@ from app_utils import date_to_yyyymmdd, validate_pressure_level
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+def _background_logger(name, handler):
+    """Return a non-propagating logger whose records are written by `handler` on a listener thread.
+
+    Callers only enqueue the record, so requests never wait on the log file. The listener is
+    stopped at exit, which flushes anything still queued.
+    """
+    log = logging.getLogger(name)
+    log.setLevel(logging.INFO)
+    log.propagate = False
+    records = queue.SimpleQueue()
+    log.addHandler(QueueHandler(records))
+    listener = QueueListener(records, handler)
+    listener.start()
+    atexit.register(listener.stop)
+    return log
+
+
+# Diagnostic record of /sample_point payloads (JSON lines)
+_sample_log = _background_logger(
+    'sample_point_calls',
+    logging.FileHandler(os.path.join(LOGS_DIR, 'sample_point_calls.log'), encoding='utf8', delay=True),
+)
+
+
+def _gzip_rotator(source, dest):
+    """RotatingFileHandler rotator that stores rolled-over logs gzip-compressed."""
+    with open(source, 'rb') as src, gzip.open(dest, 'wb', compresslevel=3) as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+# Comparable-grid reports, one JSON line per computed (date, hour). Size-capped: the live file
+# rolls over at 10 MB and at most 10 gzip-compressed backups are kept.
+_comparable_log_handler = RotatingFileHandler(
+    os.path.join(LOGS_DIR, 'comparable_grids.jsonl'),
+    maxBytes=10_000_000, backupCount=10, encoding='utf8', delay=True,
+)
+_comparable_log_handler.namer = lambda name: name + '.gz'
+_comparable_log_handler.rotator = _gzip_rotator
+_comparable_log = _background_logger('comparable_grids', _comparable_log_handler)
+
+# Shared HTTP session so availability probes, index fetches and geocoding reuse pooled TCP/TLS connections.
+# Transient S3 5xx responses are retried briefly before being reported.
+_http = requests.Session()
+_http.mount('https://', HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=64,
+    max_retries=Retry(total=2, backoff_factor=0.1, status_forcelist=[500, 502, 503, 504], raise_on_status=False),
+))
+_http.headers['User-Agent'] = WeatherMapConfig.HTTP_USER_AGENT
+
+# Short-lived cache of availability HEAD results keyed by index URL. Hits are stable once
+# published; misses get a shorter TTL so a cycle landing on S3 shows up within a minute.
+_avail_cache = TTLCache(maxsize=4096, ttl=600)
+_avail_miss_cache = TTLCache(maxsize=4096, ttl=60)
+_avail_lock = Lock()
+
+# Worker pool for concurrent outbound HTTP (batched availability probes, index fetches)
+MAX_BATCH_PROBES = 96
+_io_pool = ThreadPoolExecutor(max_workers=16)
+
+# In-flight /get_variable_data work keyed by request parameters (single-flight)
+_inflight = {}
+_inflight_lock = Lock()
+
+
+def _head_status(url: str) -> int:
+    """Return the HTTP status of a HEAD request to `url`, cached (longer for 200s).
+
+    Network errors are not cached and propagate as requests.RequestException.
+    """
+    with _avail_lock:
+        status = _avail_cache.get(url) or _avail_miss_cache.get(url)
+    if status is None:
+        # HEAD has no body to read; a short connect timeout keeps probes of unreachable hosts
+        # from holding a worker for the full read timeout
+        status = _http.head(url, timeout=(3, 7), allow_redirects=False).status_code
+        with _avail_lock:
+            (_avail_cache if status == 200 else _avail_miss_cache)[url] = status
+    return status
+
 # Available variables with descriptions
 AVAILABLE_VARIABLES = {
     'TMP': 'Temperature (F)',
@@ -66,9 +219,25 @@ AVAILABLE_VARIABLES = {
     '2sh': 'Specific Humidity',
     'ceil': 'Cloud Ceiling Height'
 }
+_AVAILABLE_VAR_KEYS = list(AVAILABLE_VARIABLES)
+
+
+@functools.cache
+def _variable_descriptions():
+    """Display labels for every known variable, built once from the generator config.
+
+    Generator VARIABLE_INFO entries ("Name (units)") take precedence over AVAILABLE_VARIABLES.
+    """
+    return AVAILABLE_VARIABLES | {
+        var: f"{info['name']} ({info['units']})" for var, info in WeatherMapConfig.VARIABLE_INFO.items()
+    }
+
+
+@functools.cache
+def _sample_urls():
+    """Example GRIB/index URLs for /debug_info, built once the generator exists."""
+    return get_weather_generator().generate_urls('20250801', 12)
 
-# Path to the weather script
-WEATHER_SCRIPT_PATH = os.path.join(os.path.dirname(__file__), 'test.py')
 
 # Available data sources
 DATA_SOURCES = {
@@ -79,124 +248,426 @@ DATA_SOURCES = {
 # Virtual / convenience data source: variables present in both 3DRTMA and RTMA
 DATA_SOURCES['3DRTMA_minus_RTMA'] = '3DRTMA minus RTMA'
 
+# Hours whose GRIB inventories are prefetched when the index page is served
+WARMUP_HOURS = (0, 6, 12, 18)
+_warmed_dates = set()
+_warmed_lock = Lock()
+
+
+def _warm_inventories(date_formatted: str, hours) -> None:
+    """Prefetch variable and pressure-level listings so the first AJAX calls hit the cache."""
+    try:
+        get_weather_generator()
+    except Exception:
+        return
+    for hour in hours:
+        for source in ('RTMA', '3DRTMA'):
+            try:
+                _filtered_variables(date_formatted, hour, source)
+                _pressure_levels(date_formatted, hour, source)
+            except Exception as e:
+                logger.debug('Warmup failed for %s %s %02dZ: %s', source, date_formatted, hour, e)
+
+
+@functools.lru_cache(maxsize=1)
+def _index_dates(today):
+    """(today, yesterday, yesterday as YYYYMMDD) strings for the index page; recomputed daily."""
+    yesterday = today - timedelta(days=1)
+    return today.strftime('%Y-%m-%d'), yesterday.strftime('%Y-%m-%d'), yesterday.strftime('%Y%m%d')
+
+
 @app.route('/')
 def index():
-    today = datetime.now()
-    yesterday = today - timedelta(days=1)
+    today_str, default_date, warm_date = _index_dates(date.today())
+
+    # Kick off a one-time background prefetch for the default date
+    with _warmed_lock:
+        start_warmup = warm_date not in _warmed_dates
+        _warmed_dates.add(warm_date)
+    if start_warmup:
+        Thread(target=_warm_inventories, args=(warm_date, WARMUP_HOURS), daemon=True).start()
     
     return render_template('index.html', 
                          variables=AVAILABLE_VARIABLES,
                          data_sources=DATA_SOURCES,
-                         default_date=yesterday.strftime('%Y-%m-%d'),
-                         today=today.strftime('%Y-%m-%d'))
+                         default_date=default_date,
+                         today=today_str)
 
-@app.route('/generate_map', methods=['POST'])
-def generate_map():
+def _request_json():
+    """Return the request's JSON body if it is an object, otherwise None.
+
+    Parsing is silent (no exception on a missing or malformed body). The raw body is decoded
+    directly with orjson, skipping get_json's content-type and caching machinery; call once
+    per request.
+    """
+    raw = request.get_data(cache=False)
+    if not raw:
+        return None
     try:
-        # Get form data
-        data = request.get_json()
-        logger.debug(f'/generate_map payload: {data}')
-        if not isinstance(data, dict):
-            return jsonify({'error': 'Invalid request payload, expected JSON object', 'received': str(data)}), 400
-        date_str = data.get('date')
-        hour = int(data.get('hour', 12))
-        variable = data.get('variable', 'TMP')  # Default to temperature
-        data_source = data.get('data_source', 'RTMA')  # Default to RTMA
-        pressure_level = data.get('pressure_level')  # Optional pressure level for 3DRTMA
-        
-        if not date_str:
-            return jsonify({'error': 'Date is required', 'received': data}), 400
-        
-        # Normalize date to YYYYMMDD (accept YYYY-MM-DD or YYYYMMDD)
+        data = orjson.loads(raw)
+    except orjson.JSONDecodeError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _error(message, status=400, **extra):
+    """Build a JSON error response: {'error': message, **extra} with the given status."""
+    body = {'error': message}
+    body.update(extra)
+    return jsonify(body), status
+
+
+def _etag_matches(etag):
+    """Whether the request's If-None-Match names `etag`."""
+    # Flask-Compress suffixes the tag with the encoding (e.g. "<etag>:gzip"); compare the base tag
+    return any(tag.split(':', 1)[0] == etag for tag in request.if_none_match)
+
+
+def _revalidated_json(payload):
+    """JSON response tagged with a content hash, or an empty 304 if the client already holds it.
+
+    `payload` is a dict or pre-serialized JSON bytes. The body is always revalidated (no-cache)
+    because listings for the current cycle can still change; the hash makes that cheap.
+    """
+    body = payload if isinstance(payload, bytes) else orjson.dumps(payload, option=OrjsonProvider.option)
+    etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+    if _etag_matches(etag):
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+RequestParams = namedtuple('RequestParams', 'date_formatted hour variable data_source pressure_level')
+
+
+def _parse_params(data, variable_default=None, require_variable=False, **error_extra):
+    """Validate the date/hour/variable/data_source/pressure_level fields shared by the endpoints.
+
+    `data` is the JSON body (or query args). Returns (RequestParams, None) on success and
+    (None, error_response) otherwise; `error_extra` is merged into error bodies. For RTMA
+    (surface) data the pressure level is dropped so the GRIB inventory picks the surface
+    record; for other sources it is validated as an int when given.
+    """
+    if data is None:
+        return None, _error('Invalid request payload, expected JSON object', **error_extra)
+    date_str = data.get('date')
+    variable = data.get('variable', variable_default)
+    if not date_str:
+        return None, _error('Date is required', **error_extra)
+    if require_variable and not variable:
+        return None, _error('Date and variable are required', **error_extra)
+    try:
+        date_formatted = date_to_yyyymmdd(date_str)
+    except ValueError:
+        return None, _error('Invalid date format. Use YYYY-MM-DD or YYYYMMDD', **error_extra)
+    hour = parse_int(data.get('hour', 12))
+    if hour is None:
+        return None, _error('Invalid hour', **error_extra)
+
+    data_source = data.get('data_source', 'RTMA')
+    pressure_level = data.get('pressure_level')
+    if data_source == 'RTMA' or pressure_level is None or pressure_level == '':
+        pressure_level = None
+    else:
         try:
-            date_formatted = date_to_yyyymmdd(date_str)
-        except ValueError:
-            return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD or YYYYMMDD', 'received': date_str}), 400
-        
-        # Create output file in static directory
-        output_filename = f'weather_map_{data_source}_{date_formatted}_{hour:02d}Z.html'
-        static_dir = os.path.join(app.root_path, 'static', 'maps')
-        os.makedirs(static_dir, exist_ok=True)
-        output_path = os.path.join(static_dir, output_filename)
-        
-        logger.info(f'Generating weather map for {date_formatted} {hour:02d}Z using {data_source}')
+            pressure_level = validate_pressure_level(pressure_level)
+        except ValueError as e:
+            return None, _error(str(e), **error_extra)
+    return RequestParams(date_formatted, hour, variable, data_source, pressure_level), None
+
+
+# Generated map files are named by their inputs and never change once written
+MAP_CACHE_CONTROL = 'public, max-age=86400, immutable'
+# When set (e.g. '/internal-maps/'), /map hands file delivery to a fronting nginx via
+# X-Accel-Redirect instead of streaming the HTML through a Python worker
+MAPS_ACCEL_PREFIX = os.environ.get('MAPS_ACCEL_PREFIX')
+# output_path -> [Lock, holders]; entries are dropped once no request holds or waits on them,
+# so request-controlled paths (including failed renders) don't accumulate
+_map_locks = {}
+_map_locks_guard = Lock()
+
+
+@contextmanager
+def _map_lock(output_path: str):
+    """Hold the lock guarding generation of a single map file."""
+    with _map_locks_guard:
+        entry = _map_locks.get(output_path)
+        if entry is None:
+            entry = _map_locks[output_path] = [Lock(), 0]
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _map_locks_guard:
+            entry[1] -= 1
+            if not entry[1]:
+                del _map_locks[output_path]
 
-        # For RTMA (surface) data, do not coerce pressure_level to an int.
-        # Let the GRIB inventory determine the appropriate surface-level record.
-        if data_source == 'RTMA':
-            pressure_level = None
-        else:
-            # Validate pressure_level if provided for pressure-enabled sources
-            if pressure_level is not None and pressure_level != '':
-                try:
-                    pressure_level = validate_pressure_level(pressure_level)
-                except ValueError as e:
-                    return jsonify({'error': str(e)}), 400
 
-        # Use the new single variable approach with data source (lazy generator)
+@app.after_request
+def add_map_cache_headers(response):
+    if request.path.startswith('/static/maps/') and response.status_code == 200:
+        response.headers['Cache-Control'] = MAP_CACHE_CONTROL
+    return response
+
+
+def _render_map_file(date_formatted: str, hour: int, variable: str, data_source: str, pressure_level):
+    """Render the map HTML into static/maps, or reuse an existing file.
+
+    Returns (success, output_filename).
+    """
+    # The file name encodes every input that affects the rendered map so an
+    # existing file can be served as-is.
+    level_tag = f'_{pressure_level}mb' if isinstance(pressure_level, int) else ''
+    output_filename = secure_filename(f'weather_map_{data_source}_{variable}{level_tag}_{date_formatted}_{hour:02d}Z.html')
+    output_path = os.path.join(STATIC_MAPS_DIR, output_filename)
+
+    # Maps are published atomically (see below), so an existing file is complete and can be
+    # reused without taking the per-file lock
+    if os.path.exists(output_path):
+        return True, output_filename
+
+    # Serialize generation per output file so concurrent identical requests render once
+    with _map_lock(output_path):
+        if os.path.exists(output_path):
+            logger.info('Reusing existing weather map %s', output_filename)
+            return True, output_filename
+        logger.info('Generating weather map for %s %02dZ using %s', date_formatted, hour, data_source)
+        # Render to a scratch file and rename it into place so readers never see a partial map
+        partial_path = output_path + '.part'
         wg = get_weather_generator()
         success = wg.create_single_variable_weather_map(
-            date_formatted, hour, output_path, variable, data_source, pressure_level
+            date_formatted, hour, partial_path, variable, data_source, pressure_level
         )
+        if success:
+            os.replace(partial_path, output_path)
+        elif os.path.exists(partial_path):
+            os.remove(partial_path)
+    return success, output_filename
+
+
+@app.route('/map', methods=['GET'])
+def map_html():
+    """Render a map and return its HTML directly.
+
+    Query args mirror the /generate_map JSON body (date, hour, variable, data_source,
+    pressure_level). The UI's map iframe loads this directly, so a map arrives in one request
+    instead of POST + GET. Rendering is idempotent: the same query always yields the same file.
+    """
+    try:
+        params, error = _parse_params(request.args, variable_default='TMP')
+        if error:
+            return error
+
+        success, output_filename = _render_map_file(*params)
+        if not success:
+            return _error('Failed to generate weather map', 500)
+        if MAPS_ACCEL_PREFIX:
+            response = app.response_class(mimetype='text/html')
+            response.headers['X-Accel-Redirect'] = MAPS_ACCEL_PREFIX.rstrip('/') + '/' + output_filename
+        else:
+            response = send_from_directory(STATIC_MAPS_DIR, output_filename)
+        response.headers['Cache-Control'] = MAP_CACHE_CONTROL
+        return response
+
+    except Exception as e:
+        logger.error('Error generating map: %s', e)
+        return _error(f'Error generating map: {str(e)}', 500)
+
+
+@app.route('/generate_map', methods=['POST'])
+def generate_map():
+    try:
+        # Get form data
+        data = _request_json()
+        logger.debug('/generate_map payload: %s', data)
+        params, error = _parse_params(data, variable_default='TMP')
+        if error:
+            return error
+
+        success, output_filename = _render_map_file(*params)
         
         if success:
             return jsonify({
                 'success': True,
                 'map_url': f'/static/maps/{output_filename}',
-                'date': date_str,
-                'date_formatted': date_formatted,
-                'hour': hour,
-                'variable': variable,
-                'data_source': data_source,
+                'date': data['date'],
+                'date_formatted': params.date_formatted,
+                'hour': params.hour,
+                'variable': params.variable,
+                'data_source': params.data_source,
                 'message': 'Weather map generated successfully!'
             })
         else:
             error_msg = 'Failed to generate weather map'
-            return jsonify({'error': error_msg}), 500
+            return _error(error_msg, 500)
             
     except Exception as e:
-        logger.error(f'Error generating map: {str(e)}')
-        return jsonify({'error': f'Error generating map: {str(e)}'}), 500
+        logger.error('Error generating map: %s', e)
+        return _error(f'Error generating map: {str(e)}', 500)
+
+def _single_flight(key, fn, *args):
+    """Run fn(*args) once per key at a time; concurrent callers with the same key share the result.
+
+    Results must be plain data (not Response objects) since they are handed to several requests.
+    """
+    with _inflight_lock:
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            future = _inflight[key] = Future()
+    if not leader:
+        return future.result()
+    try:
+        result = fn(*args)
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    else:
+        future.set_result(result)
+        return result
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+
+# 3DRTMA-minus-RTMA fields keyed by (date, hour, variable). Map clicks on the diff layer sample
+# the same field repeatedly, so the subtraction, resample and overlay render run once per key.
+_diff_cache = TTLCache(maxsize=8, ttl=WeatherMapConfig.VARIABLE_CACHE_TTL)
+_diff_cache_lock = Lock()
+
+
+def _diff_field(date_formatted: str, hour: int, variable: str):
+    """Return the cached 3DRTMA-minus-RTMA field for one variable, computing it on a miss.
+
+    Returns (entry, None) where entry holds 'diff', 'coords3' and 'info', or
+    (None, (message, http_status)) on failure. Failures are not cached.
+    """
+    key = (date_formatted, hour, variable)
+    with _diff_cache_lock:
+        entry = _diff_cache.get(key)
+    if entry is not None:
+        return entry, None
+
+    entry, error = _single_flight(('diff_field',) + key, _compute_diff_field, date_formatted, hour, variable)
+    if entry is not None:
+        with _diff_cache_lock:
+            _diff_cache[key] = entry
+    return entry, error
+
+
+def _compute_diff_field(date_formatted: str, hour: int, variable: str):
+    wg = get_weather_generator()
+    comps = compute_comparable_grids(date_formatted, hour)
+    match = next((c for c in comps.get('comparisons', []) if c.get('variable') == variable), None)
+    if not match or not match.get('best_match_3d_level'):
+        return None, (f'No comparable 3DRTMA level found for variable {variable}', 400)
+
+    best_level = match['best_match_3d_level']
+
+    # The 3DRTMA matched level and the RTMA surface field are independent downloads, so fetch them concurrently
+    grib3, idx3 = wg.generate_urls(date_formatted, hour, '3DRTMA')
+    gribr, idxr = wg.generate_urls(date_formatted, hour, 'RTMA')
+    future_3d = _io_pool.submit(wg.processor.load_single_variable, grib3, idx3, variable, best_level)
+    varr, coordsr = wg.processor.load_single_variable(gribr, idxr, variable, None)
+    var3, coords3 = future_3d.result()
+    if not var3 or coords3 is None:
+        return None, (f'Failed to load 3DRTMA variable {variable} at {best_level}mb', 500)
+    if not varr or coordsr is None:
+        return None, (f'Failed to load RTMA variable {variable}', 500)
+
+    # GRIB fields decode as float32; keep them there so the resample, subtract and cached diff
+    # move half the bytes of float64
+    data3 = np.asarray(var3['data'], dtype=np.float32)
+    datar = np.asarray(varr['data'], dtype=np.float32)
+
+    # nearest-neighbor resample of RTMA to 3D grid if needed
+    if datar.shape != data3.shape:
+        datar_resampled = resample_to_grid(datar, coordsr['lat_grid'], coordsr['lon_grid'], coords3['lat_grid'], coords3['lon_grid'])
+    else:
+        datar_resampled = datar
+
+    return {'diff': data3 - datar_resampled, 'coords3': coords3, 'info': var3.get('info') or {}}, None
+
+
+def _diff_overlay(date_formatted: str, hour: int, variable: str):
+    """Render the 3DRTMA-minus-RTMA difference overlay for one variable.
+
+    Returns (response_dict, http_status) as plain data so the result can be shared
+    between coalesced requests.
+    """
+    field, error = _diff_field(date_formatted, hour, variable)
+    if error:
+        message, status = error
+        return {'success': False, 'error': message}, status
+    # The rendered overlay is stored on the field entry so it expires together with it
+    overlay = field.get('overlay')
+    if overlay is not None:
+        return overlay, 200
+
+    wg = get_weather_generator()
+    diff = field['diff']
+    coords3 = field['coords3']
+    vabs = np.nanmax(np.abs(diff))
+    if not np.isfinite(vabs):
+        vabs = 0.0
+    levels = np.linspace(-vabs, vabs, wg.config.CONTOUR_LEVELS if wg.config.CONTOUR_LEVELS>1 else 11)
+
+    png_bytes = wg.renderer.create_contour_overlay(coords3['lon_grid'], coords3['lat_grid'], diff, levels=levels,
+                                                   cmap='RdBu_r', return_bytes=True)
+    # Persist overlay as PNG to static maps and return a compact URL to avoid huge JSON payloads
+    png_filename = f'diff_{variable}_{date_formatted}_{hour:02d}Z.png'
+    png_path = os.path.join(STATIC_MAPS_DIR, png_filename)
+    # /static/maps responses are cached as immutable, and this file is rewritten whenever the
+    # diff field expires, so publish it atomically like the HTML maps
+    partial_path = png_path + '.part'
+    try:
+        with open(partial_path, 'wb') as fh:
+            fh.write(png_bytes)
+        os.replace(partial_path, png_path)
+        image_url = f'/static/maps/{png_filename}'
+    except Exception as e:
+        logger.error('Failed to write overlay PNG: %s', e, exc_info=True)
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        # Fallback to inline base64 if file write fails
+        image_url = None
+
+    resp = {'success': True, 'bounds': coords3['bounds']}
+    if image_url:
+        resp['image_url'] = image_url
+    else:
+        resp['image_data'] = base64.b64encode(png_bytes).decode()
+    field['overlay'] = resp
+    return resp, 200
+
 
 @app.route('/get_variable_data', methods=['POST'])
 def get_variable_data():
     """AJAX endpoint to get data for a specific variable."""
     try:
-        data = request.get_json()
-        logger.debug(f'/get_variable_data payload: {data}')
-        if not isinstance(data, dict):
-            return jsonify({'error': 'Invalid request payload, expected JSON object', 'received': str(data)}), 400
-        date_str = data.get('date')
-        hour = int(data.get('hour', 12))
-        variable = data.get('variable')
-        data_source = data.get('data_source', 'RTMA')  # Default to RTMA
-        pressure_level = data.get('pressure_level')  # Optional pressure level for 3DRTMA
-        
-        logger.info(f'Received AJAX request: date={date_str}, hour={hour}, variable={variable}, source={data_source}')
-        
-        if not all([date_str, variable]):
-            return jsonify({'error': 'Date and variable are required'}), 400
-        
-        # Normalize date to YYYYMMDD
-        try:
-            date_formatted = date_to_yyyymmdd(date_str)
-        except ValueError as e:
-            logger.error(f'Invalid date format: {date_str}, error: {e}')
-            return jsonify({'error': f'Invalid date format: {date_str}. Use YYYY-MM-DD or YYYYMMDD', 'received': date_str}), 400
-        
-        logger.info(f'Getting variable data for {variable} at {date_formatted} {hour:02d}Z using {data_source}')
-        
-        # For RTMA (surface) data, ignore numeric pressure levels and let the
-        # GRIB inventory determine the correct surface record. For other data
-        # sources, validate/convert the pressure_level to int.
-        if data_source == 'RTMA':
-            pressure_level = None
-        else:
-            if pressure_level is not None and pressure_level != '':
-                try:
-                    pressure_level = int(pressure_level)
-                except Exception:
-                    return jsonify({'error': 'Invalid pressure_level; must be integer'}), 400
+        data = _request_json()
+        logger.debug('/get_variable_data payload: %s', data)
+        params, error = _parse_params(data, require_variable=True)
+        if error:
+            return error
+        date_formatted, hour, variable, data_source, pressure_level = params
+
+        logger.info('Getting variable data for %s at %s %02dZ using %s', variable, date_formatted, hour, data_source)
+
+        # Analyses are immutable once published, so the request parameters identify the response
+        etag = hashlib.blake2b(
+            f'{date_formatted}-{hour}-{variable}-{data_source}-{pressure_level}'.encode(), digest_size=16
+        ).hexdigest()
+        if _etag_matches(etag):
+            response = app.response_class(status=304)
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
 
         # Get variable data using lazy generator
         wg = get_weather_generator()
@@ -204,133 +675,65 @@ def get_variable_data():
         # Special handling: if the user requested the virtual "3DRTMA_minus_RTMA"
         # dataset, compute a difference between the 3DRTMA best-matched level and RTMA surface.
         if data_source in ('3DRTMA_minus_RTMA', '3DRTMA minus RTMA', '3DRTMA-RTMA'):
-            comps = compute_comparable_grids(date_formatted, hour)
-            match = next((c for c in comps.get('comparisons', []) if c.get('variable') == variable), None)
-            if not match or not match.get('best_match_3d_level'):
-                return jsonify({'success': False, 'error': f'No comparable 3DRTMA level found for variable {variable}'}), 400
-
-            best_level = match['best_match_3d_level']
-
-            # Load 3DRTMA var at matched level
-            grib3, idx3 = wg.generate_urls(date_formatted, hour, '3DRTMA')
-            var3, coords3 = wg.processor.load_single_variable(grib3, idx3, variable, best_level)
-            if not var3 or coords3 is None:
-                return jsonify({'success': False, 'error': f'Failed to load 3DRTMA variable {variable} at {best_level}mb'}), 500
-
-            # Load RTMA surface var
-            gribr, idxr = wg.generate_urls(date_formatted, hour, 'RTMA')
-            varr, coordsr = wg.processor.load_single_variable(gribr, idxr, variable, None)
-            if not varr or coordsr is None:
-                return jsonify({'success': False, 'error': f'Failed to load RTMA variable {variable}'}), 500
-
-            data3 = np.array(var3['data'])
-            datar = np.array(varr['data'])
-
-            # nearest-neighbor resample of RTMA to 3D grid if needed
-            def resample_to_grid(src_data, src_lat, src_lon, tgt_lat, tgt_lon):
-                try:
-                    src_lats = np.unique(src_lat[:,0])
-                    src_lons = np.unique(src_lon[0,:])
-                except Exception:
-                    src_lats = np.unique(src_lat.flatten())
-                    src_lons = np.unique(src_lon.flatten())
-
-                tgt_shape = tgt_lat.shape
-                res = np.full(tgt_shape, np.nan, dtype=float)
-                for i in range(tgt_shape[0]):
-                    lat_val = tgt_lat[i,0]
-                    lat_idx = int(np.argmin(np.abs(src_lats - lat_val)))
-                    for j in range(tgt_shape[1]):
-                        lon_val = tgt_lon[0,j]
-                        lon_idx = int(np.argmin(np.abs(src_lons - lon_val)))
-                        try:
-                            res[i,j] = src_data[lat_idx, lon_idx]
-                        except Exception:
-                            res[i,j] = np.nan
-                return res
-
-            if datar.shape != data3.shape:
-                datar_resampled = resample_to_grid(datar, coordsr['lat_grid'], coordsr['lon_grid'], coords3['lat_grid'], coords3['lon_grid'])
-            else:
-                datar_resampled = datar
-
-            diff = data3 - datar_resampled
-            vabs = np.nanmax(np.abs(diff)) if np.isfinite(np.nanmax(np.abs(diff))) else 0.0
-            levels = np.linspace(-vabs, vabs, wg.config.CONTOUR_LEVELS if wg.config.CONTOUR_LEVELS>1 else 11)
-
-            img_data = wg.renderer.create_contour_overlay(coords3['lon_grid'], coords3['lat_grid'], diff, levels=levels, cmap='RdBu_r')
-            # Persist overlay as PNG to static maps and return a compact URL to avoid huge JSON payloads
-            static_dir = os.path.join(app.root_path, 'static', 'maps')
-            os.makedirs(static_dir, exist_ok=True)
-            png_filename = f'diff_{variable}_{date_formatted}_{hour:02d}Z.png'
-            png_path = os.path.join(static_dir, png_filename)
-            try:
-                with open(png_path, 'wb') as fh:
-                    fh.write(base64.b64decode(img_data))
-                image_url = f'/static/maps/{png_filename}'
-            except Exception as e:
-                logger.error(f'Failed to write overlay PNG: {e}', exc_info=True)
-                # Fallback to inline base64 if file write fails
-                image_url = None
-
-            bounds = [[float(coords3['lat_grid'].min()), float(coords3['lon_grid'].min())], [float(coords3['lat_grid'].max()), float(coords3['lon_grid'].max())]]
-            resp = {'success': True, 'bounds': bounds}
-            if image_url:
-                resp['image_url'] = image_url
-            else:
-                resp['image_data'] = img_data
-            return jsonify(resp)
-
-        # Fallback: use existing generator JSON helper
-        result = wg.get_variable_data_json(date_formatted, hour, variable, data_source, pressure_level)
-        logger.info(f'Variable data result: success={result.get("success", False)}')
-        return jsonify(result)
+            result, status = _single_flight(('diff', date_formatted, hour, variable),
+                                            _diff_overlay, date_formatted, hour, variable)
+        else:
+            # Fallback: use existing generator JSON helper
+            result = _single_flight((date_formatted, hour, variable, data_source, pressure_level),
+                                    wg.get_variable_data_json, date_formatted, hour, variable, data_source, pressure_level)
+            status = 200
+        logger.info('Variable data result: success=%s', result.get('success', False))
+
+        response = jsonify(result)
+        response.status_code = status
+        # Only successful results are stable; failures (e.g. data not yet published) must be retried
+        if result.get('success'):
+            # Revalidated like the other tagged JSON responses (see _revalidated_json)
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'no-cache'
+        return response
         
     except Exception as e:
-        logger.error(f'Error getting variable data: {str(e)}', exc_info=True)
-        return jsonify({'error': f'Error getting variable data: {str(e)}'}), 500
+        logger.error('Error getting variable data: %s', e, exc_info=True)
+        return _error(f'Error getting variable data: {str(e)}', 500)
+
+@functools.lru_cache(maxsize=32)
+def _index_url_builder(data_source: str):
+    """Return a callable (date=, hour=) -> index URL for a data source, resolved once.
+
+    Unknown sources fall back to the default (RTMA) pattern. Reads the static config only,
+    so availability checks never need the GRIB stack or the generator.
+    """
+    sources = WeatherMapConfig.DATA_SOURCES
+    ds_info = sources.get(data_source) or sources[WeatherMapConfig.DEFAULT_DATA_SOURCE]
+    return functools.partial(ds_info['idx_pattern'].format, base_url=ds_info['base_url'])
+
+
+def _index_url(date_formatted: str, hour: int, data_source: str) -> str:
+    """Build the GRIB index URL for a data source, falling back to the RTMA pattern."""
+    return _index_url_builder(data_source)(date=date_formatted, hour=hour)
+
 
 @app.route('/check_data_availability', methods=['POST'])
 def check_data_availability():
     try:
-        data = request.get_json()
-        date_str = data.get('date')
-        data_source = data.get('data_source', 'RTMA')
-        hour = int(data.get('hour', 12))
-        
-        if not date_str:
-            return jsonify({'error': 'Date is required'}), 400
-        
-        # Normalize date
-        try:
-            date_formatted = date_to_yyyymmdd(date_str)
-        except ValueError:
-            return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD or YYYYMMDD'}), 400
-        
-        # Build URL to check using the selected data source pattern from the generator config
-        try:
-            wg = get_weather_generator()
-            cfg = wg.config
-            # Ensure requested data_source exists in config, otherwise fallback to RTMA
-            if data_source not in cfg.DATA_SOURCES:
-                data_source_key = cfg.DEFAULT_DATA_SOURCE
-            else:
-                data_source_key = data_source
-
-            ds_info = cfg.DATA_SOURCES[data_source_key]
-            pattern = ds_info.get('idx_pattern')
-            # Some patterns expect base_url and numeric hour/date placeholders
-            index_url = pattern.format(base_url=ds_info.get('base_url'), date=date_formatted, hour=hour)
-        except Exception:
-            # Fallback to original RTMA index URL
-            base_url = 'https://noaa-rtma-pds.s3.amazonaws.com'
-            index_url = f'{base_url}/rtma2p5.{date_formatted}/rtma2p5.t{hour:02d}z.2dvaranl_ndfd.grb2_wexp.idx'
+        data = _request_json()
+        # Availability is per cycle; a pressure level sent along with the UI's state is irrelevant
+        if data is not None:
+            data = {k: v for k, v in data.items() if k != 'pressure_level'}
+        params, error = _parse_params(data)
+        if error:
+            return error
+        date_str = data['date']
+        date_formatted, hour, _, data_source, _ = params
+
+        index_url = _index_url(date_formatted, hour, data_source)
 
         # Try to fetch the index file to check availability
         try:
-            response = requests.head(index_url, timeout=10)
+            status_code = _head_status(index_url)
             checked_url = index_url
-            if response.status_code == 200:
+            if status_code == 200:
                 return jsonify({
                     'available': True,
                     'date': date_str,
@@ -342,7 +745,7 @@ def check_data_availability():
                 return jsonify({
                     'available': False,
                     'checked_url': checked_url,
-                    'error': f'Data not available for {date_str} {hour:02d}Z (HTTP {response.status_code})'
+                    'error': f'Data not available for {date_str} {hour:02d}Z (HTTP {status_code})'
                 })
         except requests.RequestException as e:
             return jsonify({
@@ -352,69 +755,142 @@ def check_data_availability():
             })
             
     except Exception as e:
-        logger.error(f'Error checking data availability: {str(e)}')
-        return jsonify({'error': f'Error checking availability: {str(e)}'}), 500
+        logger.error('Error checking data availability: %s', e)
+        return _error(f'Error checking availability: {str(e)}', 500)
+
+
+@app.route('/check_data_availability_batch', methods=['POST'])
+def check_data_availability_batch():
+    """Check availability for several date/hour pairs in one request.
+
+    Expects JSON: { probes: [ { date, hour, data_source }, ... ] }
+    Returns results aligned with the input order. HEAD requests are issued concurrently.
+    """
+    try:
+        data = _request_json()
+        probes = data.get('probes') if data is not None else None
+        if not isinstance(probes, list) or not probes:
+            return _error('probes must be a non-empty list')
+        if len(probes) > MAX_BATCH_PROBES:
+            return _error(f'At most {MAX_BATCH_PROBES} probes per request')
+
+        urls = []
+        for probe in probes:
+            # Same date/hour rules as _parse_params, so a probe is valid here exactly when
+            # /check_data_availability would accept it
+            if not isinstance(probe, dict):
+                urls.append(None)
+                continue
+            try:
+                date_formatted = date_to_yyyymmdd(probe.get('date'))
+            except ValueError:
+                urls.append(None)
+                continue
+            hour = parse_int(probe.get('hour', 12))
+            if hour is None:
+                urls.append(None)
+                continue
+            urls.append(_index_url(date_formatted, hour, probe.get('data_source', 'RTMA')))
+
+        def probe_url(url):
+            if url is None:
+                return {'available': False, 'error': 'Invalid date or hour'}
+            try:
+                status_code = _head_status(url)
+            except requests.RequestException as e:
+                return {'available': False, 'checked_url': url, 'error': f'Cannot check data availability: {str(e)}'}
+            result = {'available': status_code == 200, 'checked_url': url}
+            if status_code != 200:
+                result['error'] = f'HTTP {status_code}'
+            return result
+
+        # Probes naming the same cycle share one HEAD request
+        unique_urls = list(dict.fromkeys(urls))
+        by_url = dict(zip(unique_urls, _io_pool.map(probe_url, unique_urls)))
+        results = [dict(by_url[url]) for url in urls]
+        for probe, result in zip(probes, results):
+            if isinstance(probe, dict):
+                result['date'] = probe.get('date')
+                result['hour'] = probe.get('hour')
+        return jsonify({'success': True, 'results': results})
+
+    except Exception as e:
+        logger.error('Error checking batch data availability: %s', e)
+        return _error(f'Error checking availability: {str(e)}', 500)
 
 @app.route('/debug_info', methods=['GET'])
 def debug_info():
     """Debug endpoint to check system status."""
     try:
-        # Provide safe debug info; only call generator methods if generator can be created
+        # Provide safe debug info; the generator (and its sample URLs) may be unavailable
         wg_created = False
         sample_urls = None
         try:
-            wg = get_weather_generator()
+            get_weather_generator()
             wg_created = True
-            if hasattr(wg, 'generate_urls'):
-                try:
-                    sample_urls = wg.generate_urls('20250801', 12)
-                except Exception:
-                    sample_urls = None
+            sample_urls = _sample_urls()
         except Exception:
-            wg_created = False
+            pass
 
         info = {
             'weather_generator_created': wg_created,
             'current_time': datetime.now().isoformat(),
             'sample_urls': sample_urls,
-            'available_variables': list(AVAILABLE_VARIABLES.keys()),
+            'available_variables': _AVAILABLE_VAR_KEYS,
             'flask_debug': app.debug
         }
         return jsonify(info)
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return _error(str(e), 500)
 
 @app.route('/get_pressure_levels', methods=['POST'])
 def get_pressure_levels():
     """Get available pressure levels for 3DRTMA data."""
     try:
-        data = request.get_json()
-        date_str = data.get('date')
-        hour = int(data.get('hour', 12))
-        data_source = data.get('data_source', 'RTMA')
-        
-        if not date_str:
-            return jsonify({'error': 'Date is required'}), 400
-        
-        # Normalize date
-        try:
-            date_formatted = date_to_yyyymmdd(date_str)
-        except ValueError:
-            return jsonify({'error': 'Invalid date format'}), 400
+        params, error = _parse_params(_request_json())
+        if error:
+            return error
 
-        # Get pressure levels using lazy generator
-        wg = get_weather_generator()
-        pressure_levels = wg.get_available_pressure_levels(date_formatted, hour, data_source)
+        pressure_levels = _pressure_levels(params.date_formatted, params.hour, params.data_source)
         
         return jsonify({
             'success': True,
             'pressure_levels': pressure_levels,
-            'common_levels': wg.config.COMMON_PRESSURE_LEVELS
+            'common_levels': WeatherMapConfig.COMMON_PRESSURE_LEVELS
         })
         
     except Exception as e:
-        logger.error(f'Error getting pressure levels: {str(e)}', exc_info=True)
-        return jsonify({'error': f'Error getting pressure levels: {str(e)}'}), 500
+        logger.error('Error getting pressure levels: %s', e, exc_info=True)
+        return _error(f'Error getting pressure levels: {str(e)}', 500)
+
+
+# Reverse-geocoded place names keyed by coordinates rounded to 0.01 deg (~1 km, finer than the
+# 2.5 km grid), so repeat clicks on a grid cell skip the Nominatim round trip
+_geocode_cache = TTLCache(maxsize=4096, ttl=86400)
+_geocode_lock = Lock()
+
+
+def _reverse_geocode(lat: float, lon: float) -> str:
+    """Best-effort place name for a point via Nominatim; '' when unavailable.
+
+    Only answered lookups are cached, so a timeout or rate-limit response is retried next time.
+    """
+    key = (round(lat, 2), round(lon, 2))
+    with _geocode_lock:
+        name = _geocode_cache.get(key)
+    if name is not None:
+        return name
+    try:
+        r = _http.get('https://nominatim.openstreetmap.org/reverse',
+                      params={'format': 'jsonv2', 'lat': lat, 'lon': lon}, timeout=5)
+        if r.status_code != 200:
+            return ''
+        name = r.json().get('display_name', '')
+    except Exception:
+        return ''
+    with _geocode_lock:
+        _geocode_cache[key] = name
+    return name
 
 
 @app.route('/sample_point', methods=['POST'])
@@ -424,129 +900,57 @@ def sample_point():
     Expects JSON: { lat, lon, date, hour, variable, data_source, pressure_level }
     """
     try:
-        data = request.get_json()
-        logger.debug(f'/sample_point payload: {data}')
+        data = _request_json()
+        if data is None:
+            return _error('Invalid request payload, expected JSON object', success=False)
+        logger.debug('/sample_point payload: %s', data)
 
         # Diagnostic logging (best-effort)
         try:
-            logs_dir = os.path.join(app.root_path, 'logs')
-            os.makedirs(logs_dir, exist_ok=True)
-            diag_path = os.path.join(logs_dir, 'sample_point_calls.log')
-            with open(diag_path, 'a', encoding='utf8') as df:
-                df.write(json.dumps({'time': datetime.utcnow().isoformat(), 'payload': data}) + '\n')
+            _sample_log.info('%s', orjson.dumps({'time': datetime.utcnow().isoformat(), 'payload': data}).decode())
         except Exception:
             # Don't let diagnostic logging break the endpoint
             pass
 
         lat = float(data.get('lat'))
         lon = float(data.get('lon'))
-        date_str = data.get('date')
-        hour = int(data.get('hour', 12))
-        variable = data.get('variable')
-        data_source = data.get('data_source', 'RTMA')
-        pressure_level = data.get('pressure_level')
-
-        if not all([date_str, variable]):
-            return jsonify({'success': False, 'error': 'date and variable are required'}), 400
-
-        try:
-            date_formatted = date_to_yyyymmdd(date_str)
-        except ValueError:
-            return jsonify({'success': False, 'error': 'Invalid date format'}), 400
+        params, error = _parse_params(data, require_variable=True, success=False)
+        if error:
+            return error
+        date_formatted, hour, variable, data_source, pressure_level = params
 
         wg = get_weather_generator()
 
         # For virtual dataset, compute diff and sample
         if data_source in ('3DRTMA_minus_RTMA', '3DRTMA minus RTMA', '3DRTMA-RTMA'):
-            comps = compute_comparable_grids(date_formatted, hour)
-            match = next((c for c in comps.get('comparisons', []) if c.get('variable') == variable), None)
-            if not match or not match.get('best_match_3d_level'):
-                return jsonify({'success': False, 'error': f'No comparable 3DRTMA level for {variable}'}), 400
-            best_level = match['best_match_3d_level']
-
-            grib3, idx3 = wg.generate_urls(date_formatted, hour, '3DRTMA')
-            var3, coords3 = wg.processor.load_single_variable(grib3, idx3, variable, best_level)
-            if var3 is None or coords3 is None:
-                return jsonify({'success': False, 'error': 'Failed to load 3DRTMA data'}), 500
-
-            gribr, idxr = wg.generate_urls(date_formatted, hour, 'RTMA')
-            varr, coordsr = wg.processor.load_single_variable(gribr, idxr, variable, None)
-            if varr is None or coordsr is None:
-                return jsonify({'success': False, 'error': 'Failed to load RTMA data'}), 500
-
-            data3 = np.array(var3['data'])
-            datar = np.array(varr['data'])
-
-            # nearest-neighbor resample of RTMA to 3D grid if needed
-            def resample_to_grid(src_data, src_lat, src_lon, tgt_lat, tgt_lon):
-                try:
-                    src_lats = np.unique(src_lat[:,0])
-                    src_lons = np.unique(src_lon[0,:])
-                except Exception:
-                    src_lats = np.unique(src_lat.flatten())
-                    src_lons = np.unique(src_lon.flatten())
-
-                tgt_shape = tgt_lat.shape
-                res = np.full(tgt_shape, np.nan, dtype=float)
-                for ii in range(tgt_shape[0]):
-                    lat_val = tgt_lat[ii,0]
-                    lat_idx = int(np.argmin(np.abs(src_lats - lat_val)))
-                    for jj in range(tgt_shape[1]):
-                        lon_val = tgt_lon[0,jj]
-                        lon_idx = int(np.argmin(np.abs(src_lons - lon_val)))
-                        try:
-                            res[ii,jj] = src_data[lat_idx, lon_idx]
-                        except Exception:
-                            res[ii,jj] = np.nan
-                return res
-
-            if datar.shape != data3.shape:
-                datar_resampled = resample_to_grid(datar, coordsr['lat_grid'], coordsr['lon_grid'], coords3['lat_grid'], coords3['lon_grid'])
-            else:
-                datar_resampled = datar
-
-            diff = data3 - datar_resampled
+            field, error = _diff_field(date_formatted, hour, variable)
+            if error:
+                message, status = error
+                return _error(message, status, success=False)
+            diff = field['diff']
+            coords3 = field['coords3']
 
             # Find nearest grid point in coords3 to requested lat/lon
             lat_grid = coords3['lat_grid']
             lon_grid = coords3['lon_grid']
-            flat_lats = lat_grid[:,0]
-            flat_lons = lon_grid[0,:]
-            i = int(np.argmin(np.abs(flat_lats - lat)))
-            j = int(np.argmin(np.abs(flat_lons - lon)))
+            i, j = nearest_grid_index(lat_grid, lon_grid, lat, lon)
             sampled = float(diff[i, j]) if np.isfinite(diff[i, j]) else None
 
             # Determine units: prefer the loaded variable's info; fall back to generator config VARIABLE_INFO
             units = ''
             try:
-                if isinstance(var3, dict):
-                    units = var3.get('info', {}).get('units', '') or ''
+                units = field['info'].get('units', '') or ''
             except Exception:
                 units = ''
             if not units and hasattr(wg, 'config'):
                 units = getattr(wg.config, 'VARIABLE_INFO', {}).get(variable, {}).get('units', '')
 
             # Grid cell lat/lon for the sampled i,j
-            try:
-                grid_lat = float(coords3['lat_grid'][i, j])
-                grid_lon = float(coords3['lon_grid'][i, j])
-            except Exception:
-                # fall back to row/col selection
-                grid_lat = float(coords3['lat_grid'][i, 0])
-                grid_lon = float(coords3['lon_grid'][0, j])
+            grid_lat = float(lat_grid[i, j])
+            grid_lon = float(lon_grid[i, j])
 
             # Reverse geocode (best-effort, short timeout)
-            location_name = ''
-            try:
-                nom_url = 'https://nominatim.openstreetmap.org/reverse'
-                params = {'format': 'jsonv2', 'lat': grid_lat, 'lon': grid_lon}
-                headers = {'User-Agent': '3drtma-viewer/1.0 (github:m-wessler)'}
-                r = requests.get(nom_url, params=params, headers=headers, timeout=5)
-                if r.status_code == 200:
-                    jr = r.json()
-                    location_name = jr.get('display_name', '')
-            except Exception:
-                location_name = ''
+            location_name = _reverse_geocode(grid_lat, grid_lon)
 
             return jsonify({
                 'success': True,
@@ -562,27 +966,15 @@ def sample_point():
             })
 
         # Non-virtual: load single variable and sample
-        if data_source == 'RTMA':
-            pressure_level = None
-        else:
-            if pressure_level is not None and pressure_level != '':
-                try:
-                    pressure_level = int(pressure_level)
-                except Exception:
-                    return jsonify({'success': False, 'error': 'Invalid pressure_level'}), 400
-
         grib, idx = wg.generate_urls(date_formatted, hour, data_source)
         var, coords = wg.processor.load_single_variable(grib, idx, variable, pressure_level)
         if var is None or coords is None:
-            return jsonify({'success': False, 'error': 'Failed to load variable data'}), 500
+            return _error('Failed to load variable data', 500, success=False)
 
-        data_arr = np.array(var['data'])
+        data_arr = np.asarray(var['data'])
         lat_grid = coords['lat_grid']
         lon_grid = coords['lon_grid']
-        flat_lats = lat_grid[:,0]
-        flat_lons = lon_grid[0,:]
-        i = int(np.argmin(np.abs(flat_lats - lat)))
-        j = int(np.argmin(np.abs(flat_lons - lon)))
+        i, j = nearest_grid_index(lat_grid, lon_grid, lat, lon)
         sampled = float(data_arr[i, j]) if np.isfinite(data_arr[i, j]) else None
 
         # Determine units
@@ -595,30 +987,10 @@ def sample_point():
         if not units and hasattr(wg, 'config'):
             units = getattr(wg.config, 'VARIABLE_INFO', {}).get(variable, {}).get('units', '')
 
-        # Compute grid cell coordinates and optional reverse geocode (best-effort)
-        try:
-            grid_lat = float(lat_grid[i])
-            grid_lon = float(lon_grid[j])
-        except Exception:
-            try:
-                grid_lat = float(lat_grid[i, 0])
-                grid_lon = float(lon_grid[0, j])
-            except Exception:
-                grid_lat = None
-                grid_lon = None
-
-        location_name = ''
-        if grid_lat is not None and grid_lon is not None:
-            try:
-                nom_url = 'https://nominatim.openstreetmap.org/reverse'
-                params = {'format': 'jsonv2', 'lat': grid_lat, 'lon': grid_lon}
-                headers = {'User-Agent': '3drtma-viewer/1.0 (github:m-wessler)'}
-                r = requests.get(nom_url, params=params, headers=headers, timeout=5)
-                if r.status_code == 200:
-                    jr = r.json()
-                    location_name = jr.get('display_name', '')
-            except Exception:
-                location_name = ''
+        # Grid cell coordinates and optional reverse geocode (best-effort)
+        grid_lat = float(lat_grid[i, j])
+        grid_lon = float(lon_grid[i, j])
+        location_name = _reverse_geocode(grid_lat, grid_lon)
 
         return jsonify({
             'success': True,
@@ -634,71 +1006,75 @@ def sample_point():
         })
 
     except Exception as e:
-        logger.error(f'Error sampling point: {e}', exc_info=True)
-        return jsonify({'success': False, 'error': f'Error sampling point: {str(e)}'}), 500
+        logger.error('Error sampling point: %s', e, exc_info=True)
+        return _error(f'Error sampling point: {str(e)}', 500, success=False)
 
 
 def _parse_grib_index(idx_url: str):
-    """Fetch and parse a GRIB .idx file into a mapping of variable -> list of level strings.
+    """Map each variable in a GRIB .idx file to its list of level strings.
+
+    Built from the generator's cached inventory, so the index is fetched and parsed once
+    for both this and the data-loading paths. A failed fetch yields an empty mapping
+    (and is not cached by the processor), so it is retried on the next call.
 
     Returns: dict { variable_name: [level_str,...] }
     """
     try:
-        resp = requests.get(idx_url, timeout=20)
-        resp.raise_for_status()
-        lines = resp.text.strip().split('\n')
-        mapping = {}
-        for line in lines:
-            parts = line.split(':')
-            if len(parts) >= 6:
-                var = parts[3]
-                level = parts[4]
-                mapping.setdefault(var, []).append(level)
-        return mapping
+        by_variable = get_weather_generator().processor.get_inventory_by_variable(idx_url)
     except Exception as e:
-        logger.warning(f'Unable to fetch/parse idx {idx_url}: {e}')
+        logger.warning('Unable to fetch/parse idx %s: %s', idx_url, e)
         return {}
+    return {var: [record['level'] for record in records] for var, records in by_variable.items()}
+
+
+# 3DRTMA levels (mb) considered a match for RTMA's 2 m / surface fields, nearest the ground first
+NEAR_SURFACE_LEVELS = (1000, 925, 850, 700)
+
+# Comparable-grid reports keyed by (date, hour); shared by /get_comparable_grids and the diff layer
+_comparable_cache = TTLCache(maxsize=256, ttl=600)
+_comparable_lock = Lock()
 
 
 def compute_comparable_grids(date_formatted: str, hour: int):
     """Compute comparable grids between RTMA and 3DRTMA for a date/hour.
 
     Returns a dict that mirrors the /get_comparable_grids JSON response and
-    also writes the result to logs/comparable_grids_{date}_{hour}.json
+    also appends the result to logs/comparable_grids.jsonl. Reports
+    with at least one comparison are cached, so the log is written once per
+    computed report; empty reports (index not published yet) are recomputed.
     """
+    return _comparable_report(date_formatted, hour)[0]
+
+
+def _comparable_report(date_formatted: str, hour: int):
+    """Return the cached (report, report_json_bytes) pair for a date/hour, computing it on a miss."""
+    key = (date_formatted, hour)
+    with _comparable_lock:
+        entry = _comparable_cache.get(key)
+    if entry is None:
+        entry = _single_flight(('comparable',) + key, _compute_comparable_grids, date_formatted, hour)
+        if entry[0]['comparisons']:
+            with _comparable_lock:
+                _comparable_cache[key] = entry
+    return entry
+
+
+def _compute_comparable_grids(date_formatted: str, hour: int):
     wg = get_weather_generator()
 
     # Build idx URLs for both sources
     rtma_grib, rtma_idx = wg.generate_urls(date_formatted, hour, 'RTMA')
     three_grib, three_idx = wg.generate_urls(date_formatted, hour, '3DRTMA')
 
+    future_three = _io_pool.submit(_parse_grib_index, three_idx)
     rtma_map = _parse_grib_index(rtma_idx)
-    three_map = _parse_grib_index(three_idx)
+    three_map = future_three.result()
 
     # variables union
     vars_union = set(list(rtma_map.keys()) + list(three_map.keys()))
 
     comparisons = []
 
-    # helper to parse pressure ints from level strings
-    def extract_pressure_ints(levels):
-        ints = []
-        for lv in levels:
-            if not lv:
-                continue
-            m = re.search(r"(\d{2,4})\s*mb", (lv or '').lower())
-            if m:
-                try:
-                    ints.append(int(m.group(1)))
-                except Exception:
-                    continue
-            # catch plain numbers
-            else:
-                m2 = re.search(r"^(\d{2,4})$", (lv or '').strip())
-                if m2:
-                    ints.append(int(m2.group(1)))
-        return sorted(list(set(ints)))
-
     for var in sorted(vars_union):
         rtma_levels = rtma_map.get(var, [])
         three_levels_raw = three_map.get(var, [])
@@ -707,21 +1083,14 @@ def compute_comparable_grids(date_formatted: str, hour: int):
         rtma_has_2m = any('2 m' in (l or '').lower() or '2m' in (l or '').lower() for l in rtma_levels)
         rtma_has_surface = any('surface' in (l or '').lower() or 'sfc' in (l or '').lower() for l in rtma_levels)
 
-        three_levels = extract_pressure_ints(three_levels_raw)
+        three_levels = extract_pressure_levels(three_levels_raw)
 
         # Heuristic best match: if RTMA has 2m/surface, prefer near-surface pressure (~1000,925,850)
         best_match = None
-        best_diff = None
         if three_levels:
             if rtma_has_2m or rtma_has_surface:
-                targets = [1000, 925, 850, 700]
-                # pick the closest available to any of the targets
-                for candidate in three_levels:
-                    for t in targets:
-                        d = abs(candidate - t)
-                        if best_diff is None or d < best_diff:
-                            best_diff = d
-                            best_match = candidate
+                # pick the closest available to any of the near-surface targets
+                best_match = closest_level(three_levels, NEAR_SURFACE_LEVELS)
             else:
                 # no 2m info -> pick median/nearest to 500 mb as a generic middle level
                 median = three_levels[len(three_levels)//2]
@@ -734,25 +1103,22 @@ def compute_comparable_grids(date_formatted: str, hour: int):
             'rtma_has_surface': rtma_has_surface,
             'three_d_levels': three_levels,
             'best_match_3d_level': best_match,
-            'rtma_idx_url': rtma_idx,
-            'three_idx_url': three_idx
         })
 
-    result = {'success': True, 'comparisons': comparisons}
+    # Every comparison comes from the same two index files, so their URLs are reported once
+    # rather than repeated per variable (they were ~2/3 of the payload)
+    result = {'success': True, 'date': date_formatted, 'hour': hour,
+              'rtma_idx_url': rtma_idx, 'three_idx_url': three_idx, 'comparisons': comparisons}
+    # Serialized once: the same bytes are logged and served by /get_comparable_grids
+    body = orjson.dumps(result)
 
-    # Also write the result to a log file for offline inspection
+    # Also record the result in the report log for offline inspection
     try:
-        logs_dir = os.path.join(app.root_path, 'logs')
-        os.makedirs(logs_dir, exist_ok=True)
-        fname = f'comparable_grids_{date_formatted}_{hour:02d}.json'
-        out_path = os.path.join(logs_dir, fname)
-        with open(out_path, 'w', encoding='utf8') as f:
-            json.dump({'date': date_formatted, 'hour': hour, 'comparisons': comparisons}, f, indent=2)
-        logger.info(f'Wrote comparable grids to {out_path}')
+        _comparable_log.info('%s', body.decode())
     except Exception as e:
-        logger.warning(f'Failed to write comparable grids log: {e}')
+        logger.warning('Failed to write comparable grids log: %s', e)
 
-    return result
+    return result, body
 
 
 @app.route('/get_comparable_grids', methods=['POST'])
@@ -760,134 +1126,174 @@ def get_comparable_grids():
     """Return a list of comparable grids between RTMA (surface) and 3DRTMA (pressure levels).
 
     Request JSON: { date: 'YYYY-MM-DD' | 'YYYYMMDD', hour: int }
-    Response: { success: True, comparisons: [ { variable, rtma_levels, rtma_has_2m, three_d_levels, best_match_3d_level, idx_urls } ] }
+    Response: { success: True, date, hour, rtma_idx_url, three_idx_url,
+                comparisons: [ { variable, rtma_levels, rtma_has_2m, rtma_has_surface, three_d_levels, best_match_3d_level } ] }
     """
     try:
-        data = request.get_json()
-        if not isinstance(data, dict):
-            return jsonify({'error': 'Invalid request payload'}), 400
-        date_str = data.get('date')
-        hour = int(data.get('hour', 12))
+        params, error = _parse_params(_request_json())
+        if error:
+            return error
 
-        if not date_str:
-            return jsonify({'error': 'Date is required'}), 400
+        _, body = _comparable_report(params.date_formatted, params.hour)
+        return _revalidated_json(body)
+
+    except Exception as e:
+        logger.error('Error computing comparable grids: %s', e, exc_info=True)
+        return _error(str(e), 500)
+
+# Derived selector listings (variables, pressure levels) keyed by request parameters
+_listing_cache = TTLCache(maxsize=1024, ttl=600)
+_listing_lock = Lock()
+
+
+def _cached_listing(key, fn, *args):
+    """Return fn(*args), memoizing non-empty results under `key`.
+
+    Empty lists are not cached: the generator also returns [] when the index fetch fails
+    or the cycle is not published yet.
+    """
+    with _listing_lock:
+        value = _listing_cache.get(key)
+    if value is None:
+        value = fn(*args)
+        if value:
+            with _listing_lock:
+                _listing_cache[key] = value
+    return value
+
+
+def _pressure_levels(date_formatted: str, hour: int, data_source: str):
+    """Pressure levels available for a data source (cached)."""
+    wg = get_weather_generator()
+    return _cached_listing(('levels', date_formatted, hour, data_source),
+                           wg.get_available_pressure_levels, date_formatted, hour, data_source)
+
+
+def _level_variables(date_formatted: str, hour: int, data_source: str, pressure_level: int):
+    """Variables available at one pressure level (cached)."""
+    wg = get_weather_generator()
+    return _cached_listing(('level_vars', date_formatted, hour, data_source, pressure_level),
+                           wg.get_variables_for_pressure_level, date_formatted, hour, data_source, pressure_level)
+
+
+def _filtered_variables(date_formatted: str, hour: int, data_source: str):
+    """Variables available for a data source, including the virtual 3DRTMA-minus-RTMA source (cached)."""
+    return _cached_listing(('vars', date_formatted, hour, data_source),
+                           _compute_filtered_variables, date_formatted, hour, data_source)
+
+
+def _compute_filtered_variables(date_formatted: str, hour: int, data_source: str):
+    wg = get_weather_generator()
+
+    # Support a virtual data source which is the intersection of 3DRTMA and RTMA
+    if data_source in ('3DRTMA minus RTMA', '3DRTMA_minus_RTMA', '3DRTMA-RTMA'):
+        # The two sources use different index files, so fetch them concurrently
+        future_3d = _io_pool.submit(wg.get_filtered_variables, date_formatted, hour, '3DRTMA')
+        vars_rtma = set(wg.get_filtered_variables(date_formatted, hour, 'RTMA'))
+        # The 3DRTMA listing is already sorted, so filtering it in order keeps the result sorted.
+        # Only keep variables that are in our AVAILABLE_VARIABLES map as well.
+        return [var for var in future_3d.result() if var in vars_rtma and var in AVAILABLE_VARIABLES]
+    return wg.get_filtered_variables(date_formatted, hour, data_source)
+
+
+def _describe_variables(variables):
+    """Map each variable name to its display label."""
+    descriptions = _variable_descriptions()
+    return {var: descriptions.get(var, var) for var in variables}
 
-        try:
-            date_formatted = date_to_yyyymmdd(date_str)
-        except ValueError:
-            return jsonify({'error': 'Invalid date format'}), 400
 
-        result = compute_comparable_grids(date_formatted, hour)
-        return jsonify(result)
+@app.route('/ui_state', methods=['POST'])
+def ui_state():
+    """Return everything the form needs after a date/hour/source change in one response.
+
+    Request JSON: { date, hour, data_source, pressure_level (optional) }
+    Response: { success, pressure_levels, common_levels, variables }
+    When pressure_level is given, variables are those available at that level.
+    """
+    try:
+        params, error = _parse_params(_request_json())
+        if error:
+            return error
+        date_formatted, hour, _, data_source, pressure_level = params
+
+        # Levels and variables for one source come from the same (cached) index file,
+        # so they are computed back to back rather than in parallel.
+        pressure_levels = _pressure_levels(date_formatted, hour, data_source)
+        if pressure_level is not None:
+            variables = _level_variables(date_formatted, hour, data_source, pressure_level)
+        else:
+            variables = _filtered_variables(date_formatted, hour, data_source)
+
+        return _revalidated_json({
+            'success': True,
+            'pressure_levels': pressure_levels,
+            'common_levels': WeatherMapConfig.COMMON_PRESSURE_LEVELS,
+            'variables': _describe_variables(variables)
+        })
 
     except Exception as e:
-        logger.error(f'Error computing comparable grids: {e}', exc_info=True)
-        return jsonify({'error': str(e)}), 500
+        logger.error('Error getting UI state: %s', e, exc_info=True)
+        return _error(f'Error getting UI state: {str(e)}', 500)
+
 
 @app.route('/get_filtered_variables', methods=['POST'])
 def get_filtered_variables():
     """Get available variables filtered for the selected data source."""
     try:
-        data = request.get_json()
-        date_str = data.get('date')
-        hour = int(data.get('hour', 12))
-        data_source = data.get('data_source', 'RTMA')
-        
-        if not date_str:
-            return jsonify({'error': 'Date is required'}), 400
-        
-        # Normalize date
-        try:
-            date_formatted = date_to_yyyymmdd(date_str)
-        except ValueError:
-            return jsonify({'error': 'Invalid date format'}), 400
+        params, error = _parse_params(_request_json())
+        if error:
+            return error
 
         # Get filtered variables using lazy generator
-        wg = get_weather_generator()
-
-        # Support a virtual data source which is the intersection of 3DRTMA and RTMA
-        if data_source in ('3DRTMA minus RTMA', '3DRTMA_minus_RTMA', '3DRTMA-RTMA'):
-            vars_3d = set(wg.get_filtered_variables(date_formatted, hour, '3DRTMA'))
-            vars_rtma = set(wg.get_filtered_variables(date_formatted, hour, 'RTMA'))
-            # only keep variables that are in our AVAILABLE_VARIABLES map as well
-            variables = sorted(list(vars_3d.intersection(vars_rtma).intersection(set(AVAILABLE_VARIABLES.keys()))))
-        else:
-            variables = wg.get_filtered_variables(date_formatted, hour, data_source)
-        
-        # Create variables with descriptions
-        variables_with_desc = {}
-        for var in variables:
-            if var in wg.config.VARIABLE_INFO:
-                var_info = wg.config.VARIABLE_INFO[var]
-                variables_with_desc[var] = f"{var_info['name']} ({var_info['units']})"
-            elif var in AVAILABLE_VARIABLES:
-                variables_with_desc[var] = AVAILABLE_VARIABLES[var]
-            else:
-                variables_with_desc[var] = var
-        return jsonify({
+        variables = _filtered_variables(params.date_formatted, params.hour, params.data_source)
+        return _revalidated_json({
             'success': True,
-            'variables': variables_with_desc
+            'variables': _describe_variables(variables)
         })
         
     except Exception as e:
-        logger.error(f'Error getting filtered variables: {str(e)}', exc_info=True)
-        return jsonify({'error': f'Error getting filtered variables: {str(e)}'}), 500
+        logger.error('Error getting filtered variables: %s', e, exc_info=True)
+        return _error(f'Error getting filtered variables: {str(e)}', 500)
 
 @app.route('/get_variables_for_pressure_level', methods=['POST'])
 def get_variables_for_pressure_level():
     """Get available variables for a specific pressure level in 3DRTMA data."""
     try:
-        data = request.get_json()
-        date_str = data.get('date')
-        hour = int(data.get('hour', 12))
-        data_source = data.get('data_source', 'RTMA')
-        pressure_level = data.get('pressure_level')
-        
-        if not all([date_str, pressure_level is not None]):
-            return jsonify({'error': 'Date and pressure level are required'}), 400
-        
-        # Normalize date
-        try:
-            date_formatted = date_to_yyyymmdd(date_str)
-        except ValueError:
-            return jsonify({'error': 'Invalid date format'}), 400
-
-        # Validate pressure level
-        try:
-            pressure_level_int = int(pressure_level)
-        except Exception:
-            return jsonify({'error': 'Invalid pressure level'}), 400
+        data = _request_json()
+        params, error = _parse_params(data)
+        if error:
+            return error
+        pressure_level = params.pressure_level
+        # _parse_params drops the level for RTMA, but this listing is keyed by it for every source
+        if params.data_source == 'RTMA' and data.get('pressure_level') not in (None, ''):
+            try:
+                pressure_level = validate_pressure_level(data['pressure_level'])
+            except ValueError as e:
+                return _error(str(e))
+        if pressure_level is None:
+            return _error('Date and pressure level are required')
 
-        # Get variables for specific pressure level using lazy generator
-        wg = get_weather_generator()
-        variables = wg.get_variables_for_pressure_level(date_formatted, hour, data_source, pressure_level_int)
+        variables = _level_variables(params.date_formatted, params.hour, params.data_source, pressure_level)
         
-        # Create variables with descriptions
-        variables_with_desc = {}
-        for var in variables:
-            if var in wg.config.VARIABLE_INFO:
-                var_info = wg.config.VARIABLE_INFO[var]
-                variables_with_desc[var] = f"{var_info['name']} ({var_info['units']})"
-            elif var in AVAILABLE_VARIABLES:
-                variables_with_desc[var] = AVAILABLE_VARIABLES[var]
-            else:
-                variables_with_desc[var] = var
-        
-        return jsonify({
+        return _revalidated_json({
             'success': True,
-            'variables': variables_with_desc
+            'variables': _describe_variables(variables)
         })
         
     except Exception as e:
-        logger.error(f'Error getting variables for pressure level: {str(e)}', exc_info=True)
-        return jsonify({'error': f'Error getting variables for pressure level: {str(e)}'}), 500
+        logger.error('Error getting variables for pressure level: %s', e, exc_info=True)
+        return _error(f'Error getting variables for pressure level: {str(e)}', 500)
 
 if __name__ == '__main__':
-    # Create necessary directories
-    os.makedirs('templates', exist_ok=True)
-    os.makedirs('static/maps', exist_ok=True)
-    
     print('Starting Weather Map Web Application...')
     print('Open your browser to: http://localhost:5000')
     
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    if os.environ.get('FLASK_DEBUG') == '1':
+        # Werkzeug dev server with reloader/debugger; threaded so slow GRIB loads don't block probes
+        app.run(debug=True, threaded=True, host='0.0.0.0', port=5000)
+    else:
+        from waitress import serve
+        # GRIB downloads block a worker thread for seconds, so size the pool to the expected
+        # number of concurrent map/data requests rather than to the CPU count
+        serve(app, host='0.0.0.0', port=int(os.environ.get('PORT', 5000)),
+              threads=int(os.environ.get('WAITRESS_THREADS', 16)), connection_limit=256)
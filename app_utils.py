@@ -1,4 +1,9 @@
-from datetime import datetime
+import math
+import re
+from datetime import date, datetime
+from functools import lru_cache
+
+import numpy as np
 
 
 def date_to_yyyymmdd(date_str: str) -> str:
@@ -8,9 +13,27 @@ def date_to_yyyymmdd(date_str: str) -> str:
     """
     if not date_str:
         raise ValueError('Empty date string')
-    if isinstance(date_str, str) and len(date_str) == 8 and date_str.isdigit():
+    if not isinstance(date_str, str):
+        raise ValueError('Invalid date format')
+    return _normalize_date(date_str)
+
+
+@lru_cache(maxsize=4096)
+def _normalize_date(date_str: str) -> str:
+    # the UI only ever sends a handful of distinct dates, so results are memoized
+    if len(date_str) == 8 and date_str.isdigit():
         return date_str
-    # support YYYY-MM-DD
+    # fast path for the canonical YYYY-MM-DD form: slice instead of strptime
+    if len(date_str) == 10 and date_str[4] == '-' and date_str[7] == '-':
+        compact = date_str[:4] + date_str[5:7] + date_str[8:]
+        if compact.isdigit():
+            try:
+                # validates the calendar date without strptime's format machinery
+                date(int(compact[:4]), int(compact[4:6]), int(compact[6:]))
+            except ValueError:
+                raise ValueError('Invalid date format')
+            return compact
+    # support other YYYY-MM-DD spellings (e.g. unpadded month/day)
     try:
         dt = datetime.strptime(date_str, '%Y-%m-%d')
         return dt.strftime('%Y%m%d')
@@ -18,6 +41,27 @@ def date_to_yyyymmdd(date_str: str) -> str:
         raise ValueError('Invalid date format')
 
 
+def parse_int(value):
+    """Return `value` as an int if it is an int, a finite float or an integer string, else None.
+
+    Strings are checked up front (optional sign, decimal digits, surrounding whitespace)
+    instead of relying on int() raising for malformed request input. Booleans are rejected
+    even though bool subclasses int, so a JSON `true` is not read as 1.
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return int(value)
+    if isinstance(value, str):
+        digits = value.strip()
+        if digits[:1] in ('+', '-'):
+            digits = digits[1:]
+        return int(value) if digits.isdecimal() else None
+    if isinstance(value, float) and math.isfinite(value):
+        return int(value)
+    return None
+
+
 def validate_pressure_level(value):
     """Validate and convert pressure level input to int.
 
@@ -25,7 +69,95 @@ def validate_pressure_level(value):
     """
     if value is None or (isinstance(value, str) and value.strip() == ''):
         raise ValueError('pressure_level is required')
+    level = parse_int(value)
+    if level is None:
+        raise ValueError('Invalid pressure_level; must be integer')
+    return level
+
+
+# "500 mb" anywhere in a GRIB level string, or a bare number as the whole string
+_PRESSURE_LEVEL_RE = re.compile(r'(\d{2,4})\s*mb|^\s*(\d{2,4})\s*$', re.IGNORECASE)
+
+
+def extract_pressure_levels(levels):
+    """Sorted unique pressure levels (mb) named by a list of GRIB level strings."""
+    matches = (_PRESSURE_LEVEL_RE.search(lv) for lv in levels if lv)
+    return sorted({int(m.group(1) or m.group(2)) for m in matches if m})
+
+
+def nearest_index(sorted_values, targets):
+    """Index of the nearest entry of ascending `sorted_values` for each target.
+
+    Equivalent to argmin(abs(sorted_values - t)) per target (ties go to the lower index),
+    but uses a binary search instead of scanning the whole array.
+    """
+    sorted_values = np.asarray(sorted_values)
+    targets = np.asarray(targets)
+    if sorted_values.size < 2:
+        return np.zeros(targets.shape, dtype=np.intp)
+    idx = np.clip(np.searchsorted(sorted_values, targets), 1, sorted_values.size - 1)
+    closer_left = (targets - sorted_values[idx - 1]) <= (sorted_values[idx] - targets)
+    return idx - closer_left
+
+
+def closest_level(sorted_levels, targets):
+    """Entry of ascending `sorted_levels` closest to any of `targets`; ties go to the lower level.
+
+    Binary-searches the nearest level per target (O(T log L)) instead of comparing every
+    level/target pair. Returns None when `sorted_levels` is empty.
+    """
+    if not len(sorted_levels):
+        return None
+    levels = np.asarray(sorted_levels)
+    targets = np.asarray(targets)
+    nearest = levels[nearest_index(levels, targets)]
+    distance = np.abs(nearest - targets)
+    return nearest[distance == distance.min()].min().item()
+
+
+def nearest_grid_index(lat_grid, lon_grid, lat, lon, stride=16):
+    """(row, col) of the cell of a 2-D lat/lon grid closest to (lat, lon).
+
+    Works for curvilinear grids (e.g. the Lambert conformal NDFD grid, whose rows are not
+    lines of constant latitude). A strided subsample is searched first, then the full-resolution
+    window around that hit, so only a small fraction of the grid is visited. Distances use an
+    equirectangular approximation, which is exact enough to pick neighbouring 2.5 km cells.
+    """
+    lat_grid = np.asarray(lat_grid)
+    lon_grid = np.asarray(lon_grid)
+    lon_scale = np.cos(np.radians(lat))
+
+    def closest(lats, lons):
+        dist = (lats - lat) ** 2 + ((lons - lon) * lon_scale) ** 2
+        return np.unravel_index(int(np.argmin(dist)), dist.shape)
+
+    ci, cj = closest(lat_grid[::stride, ::stride], lon_grid[::stride, ::stride])
+    i0 = max(ci * stride - stride, 0)
+    j0 = max(cj * stride - stride, 0)
+    i1 = ci * stride + stride + 1
+    j1 = cj * stride + stride + 1
+    wi, wj = closest(lat_grid[i0:i1, j0:j1], lon_grid[i0:i1, j0:j1])
+    return i0 + int(wi), j0 + int(wj)
+
+
+def resample_to_grid(src_data, src_lat, src_lon, tgt_lat, tgt_lon):
+    """Nearest-neighbor resample of `src_data` onto a target lat/lon grid.
+
+    Rows/columns are matched on the distinct source latitudes/longitudes; target cells
+    whose nearest index falls outside `src_data` are NaN. Float input keeps its precision.
+    """
     try:
-        return int(value)
+        src_lats = np.unique(src_lat[:, 0])
+        src_lons = np.unique(src_lon[0, :])
     except Exception:
-        raise ValueError('Invalid pressure_level; must be integer')
+        src_lats = np.unique(src_lat.flatten())
+        src_lons = np.unique(src_lon.flatten())
+
+    lat_idx = nearest_index(src_lats, tgt_lat[:, 0])
+    lon_idx = nearest_index(src_lons, tgt_lon[0, :])
+    rows = lat_idx < src_data.shape[0]
+    cols = lon_idx < src_data.shape[1]
+
+    res = np.full(tgt_lat.shape, np.nan, dtype=np.result_type(src_data.dtype, np.float32))
+    res[np.ix_(rows, cols)] = src_data[np.ix_(lat_idx[rows], lon_idx[cols])]
+    return res
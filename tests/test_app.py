@@ -0,0 +1,465 @@
+import logging
+import os
+import sys
+import threading
+
+import pytest
+
+# Ensure project root is on sys.path for imports when running pytest from tests/
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Keep the GRIB stack out of these tests: nothing may build the real generator in the background
+os.environ.setdefault('WG_PRELOAD', '0')
+
+import app as app_module
+
+
+def test_map_lock_serializes_and_is_released():
+    path = '/tmp/weather_map_test.html'
+    order = []
+    entered = threading.Event()
+    release = threading.Event()
+
+    def first():
+        with app_module._map_lock(path):
+            entered.set()
+            release.wait(5)
+            order.append('first')
+
+    def second():
+        entered.wait(5)
+        with app_module._map_lock(path):
+            order.append('second')
+
+    threads = [threading.Thread(target=first), threading.Thread(target=second)]
+    for t in threads:
+        t.start()
+    entered.wait(5)
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert order == ['first', 'second']
+    assert path not in app_module._map_locks
+
+
+def test_map_lock_is_released_on_error():
+    with pytest.raises(RuntimeError):
+        with app_module._map_lock('/tmp/failed_map.html'):
+            raise RuntimeError('render failed')
+    assert '/tmp/failed_map.html' not in app_module._map_locks
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # Keep /sample_point's diagnostic log out of the tracked logs/ directory
+    monkeypatch.setattr(app_module, '_sample_log', logging.getLogger('test_sample_point_calls'))
+    monkeypatch.setattr(app_module, '_head_status', lambda url: 200)
+    return app_module.app.test_client()
+
+
+# Every endpoint that validates its body with _parse_params; lat/lon let /sample_point reach it
+PARAM_ENDPOINTS = [
+    '/generate_map',
+    '/get_variable_data',
+    '/check_data_availability',
+    '/get_pressure_levels',
+    '/sample_point',
+    '/get_comparable_grids',
+    '/ui_state',
+    '/get_filtered_variables',
+    '/get_variables_for_pressure_level',
+]
+BASE_BODY = {'date': '2025-08-14', 'hour': 12, 'variable': 'TMP', 'lat': 40.0, 'lon': -105.0}
+
+
+def _without(body, key):
+    return {k: v for k, v in body.items() if k != key}
+
+
+@pytest.mark.parametrize('endpoint', PARAM_ENDPOINTS)
+@pytest.mark.parametrize('body, message', [
+    (_without(BASE_BODY, 'date'), 'Date is required'),
+    (dict(BASE_BODY, date='08/14/2025'), 'Invalid date format. Use YYYY-MM-DD or YYYYMMDD'),
+    (dict(BASE_BODY, hour='noon'), 'Invalid hour'),
+    (dict(BASE_BODY, hour=True), 'Invalid hour'),
+    (dict(BASE_BODY, data_source='3DRTMA', pressure_level='high'), 'Invalid pressure_level; must be integer'),
+])
+def test_parse_params_errors(client, endpoint, body, message):
+    if endpoint == '/check_data_availability' and 'pressure_level' in body:
+        pytest.skip('availability checks ignore pressure_level')
+    response = client.post(endpoint, json=body)
+    assert response.status_code == 400
+    assert response.get_json()['error'] == message
+
+
+@pytest.mark.parametrize('endpoint', PARAM_ENDPOINTS)
+def test_non_object_payload_is_rejected(client, endpoint):
+    response = client.post(endpoint, json=[BASE_BODY])
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Invalid request payload, expected JSON object'
+
+
+def test_parse_params_pressure_level_by_source():
+    with app_module.app.test_request_context():
+        params, error = app_module._parse_params(dict(BASE_BODY, data_source='RTMA', pressure_level='high'))
+        assert error is None and params.pressure_level is None
+
+        params, error = app_module._parse_params(dict(BASE_BODY, data_source='3DRTMA', pressure_level='500'))
+        assert error is None and params.pressure_level == 500
+
+        params, error = app_module._parse_params(dict(BASE_BODY, data_source='3DRTMA', pressure_level=''))
+        assert error is None and params.pressure_level is None
+
+
+def test_variables_for_pressure_level_validates_rtma_level(client):
+    body = dict(BASE_BODY, data_source='RTMA', pressure_level='high')
+    response = client.post('/get_variables_for_pressure_level', json=body)
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Invalid pressure_level; must be integer'
+
+
+@pytest.mark.parametrize('data_source', ['RTMA', '3DRTMA'])
+def test_check_data_availability_ignores_pressure_level(client, data_source):
+    # Availability is per cycle, so a stray (even malformed) level never turns the check into a 400
+    body = dict(BASE_BODY, data_source=data_source, pressure_level='high')
+    response = client.post('/check_data_availability', json=body)
+    assert response.status_code == 200
+    result = response.get_json()
+    assert result['available'] is True
+    assert result['checked_url'] == app_module._index_url('20250814', 12, data_source)
+
+
+class _WatchedInflight(dict):
+    """In-flight map that signals once a caller has found an existing entry (i.e. joined as a follower)."""
+
+    def __init__(self):
+        super().__init__()
+        self.joined = threading.Event()
+
+    def get(self, key, default=None):
+        value = super().get(key, default)
+        if value is not None:
+            self.joined.set()
+        return value
+
+
+def _run_leader_and_follower(monkeypatch, fn):
+    """Call _single_flight from two threads, the second arriving while fn is still running."""
+    inflight = _WatchedInflight()
+    monkeypatch.setattr(app_module, '_inflight', inflight)
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+    outcomes = {}
+
+    def blocking(x):
+        calls.append(x)
+        started.set()
+        release.wait(5)
+        return fn(x)
+
+    def call(name):
+        try:
+            outcomes[name] = ('result', app_module._single_flight('key', blocking, 21))
+        except Exception as e:
+            outcomes[name] = ('error', e)
+
+    leader = threading.Thread(target=call, args=('leader',))
+    leader.start()
+    assert started.wait(5)
+    follower = threading.Thread(target=call, args=('follower',))
+    follower.start()
+    assert inflight.joined.wait(5)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+    assert calls == [21]
+    assert 'key' not in inflight
+    return outcomes
+
+
+def test_single_flight_shares_result(monkeypatch):
+    outcomes = _run_leader_and_follower(monkeypatch, lambda x: {'value': x * 2})
+    assert outcomes['leader'] == ('result', {'value': 42})
+    assert outcomes['follower'] == ('result', {'value': 42})
+
+
+def test_single_flight_propagates_error(monkeypatch):
+    def fail(x):
+        raise ValueError('download failed')
+
+    outcomes = _run_leader_and_follower(monkeypatch, fail)
+    for name in ('leader', 'follower'):
+        kind, error = outcomes[name]
+        assert kind == 'error' and isinstance(error, ValueError)
+        assert str(error) == 'download failed'
+
+
+class _FakeGenerator:
+    """Stands in for the GRIB-backed generator; returns canned results and counts calls."""
+
+    def __init__(self, result):
+        self.result = result
+        self.calls = 0
+
+    def get_variable_data_json(self, *args):
+        self.calls += 1
+        return self.result
+
+
+VARIABLE_BODY = {'date': '2025-08-14', 'hour': 12, 'variable': 'TMP', 'data_source': 'RTMA'}
+
+
+def test_variable_data_revalidates_successful_result(client, monkeypatch):
+    wg = _FakeGenerator({'success': True, 'values': [1, 2, 3]})
+    monkeypatch.setattr(app_module, 'get_weather_generator', lambda: wg)
+
+    first = client.post('/get_variable_data', json=VARIABLE_BODY)
+    assert first.status_code == 200
+    etag, _ = first.get_etag()
+    assert etag
+    assert first.headers['Cache-Control'] == 'no-cache'
+
+    second = client.post('/get_variable_data', json=VARIABLE_BODY, headers={'If-None-Match': f'"{etag}"'})
+    assert second.status_code == 304
+    assert second.get_etag()[0] == etag
+    assert second.headers['Cache-Control'] == 'no-cache'
+    assert wg.calls == 1
+
+
+def test_variable_data_failure_is_not_tagged(client, monkeypatch):
+    wg = _FakeGenerator({'success': False, 'error': 'Data not yet published'})
+    monkeypatch.setattr(app_module, 'get_weather_generator', lambda: wg)
+
+    first = client.post('/get_variable_data', json=VARIABLE_BODY)
+    assert first.status_code == 200
+    assert first.get_etag() == (None, None)
+    assert 'Cache-Control' not in first.headers
+
+
+def test_variable_data_etag_is_stable_across_parameters(client, monkeypatch):
+    wg = _FakeGenerator({'success': True})
+    monkeypatch.setattr(app_module, 'get_weather_generator', lambda: wg)
+
+    etag = client.post('/get_variable_data', json=VARIABLE_BODY).get_etag()[0]
+    assert client.post('/get_variable_data', json=VARIABLE_BODY).get_etag()[0] == etag
+    other = client.post('/get_variable_data', json=dict(VARIABLE_BODY, hour=13)).get_etag()[0]
+    assert other != etag
+
+
+@pytest.mark.parametrize('header, expected', [
+    ('"abc123"', True),
+    ('"abc123:gzip"', True),
+    ('"other", "abc123:gzip"', True),
+    ('"abc1234"', False),
+    ('"other:gzip"', False),
+])
+def test_etag_matches_ignores_compression_suffix(header, expected):
+    with app_module.app.test_request_context(headers={'If-None-Match': header}):
+        assert app_module._etag_matches('abc123') is expected
+
+
+class _FakeListingGenerator:
+    """Serves fixed selector listings and counts index lookups."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def get_available_pressure_levels(self, date_formatted, hour, data_source):
+        self.calls += 1
+        return [500, 850]
+
+    def get_filtered_variables(self, date_formatted, hour, data_source):
+        self.calls += 1
+        return ['TMP', 'UGRD']
+
+    def get_variables_for_pressure_level(self, date_formatted, hour, data_source, pressure_level):
+        self.calls += 1
+        return ['TMP']
+
+
+@pytest.fixture
+def listing_client(client, monkeypatch):
+    monkeypatch.setattr(app_module, '_listing_cache', {})
+    monkeypatch.setattr(app_module, 'get_weather_generator', _FakeListingGenerator)
+    report = {'success': True, 'comparisons': [{'variable': 'TMP', 'best_match_3d_level': 1000}]}
+    monkeypatch.setattr(app_module, '_comparable_report',
+                        lambda date_formatted, hour: (report, app_module.orjson.dumps(report)))
+    return client
+
+
+@pytest.mark.parametrize('endpoint, body', [
+    ('/ui_state', {'date': '2025-08-14', 'hour': 12, 'data_source': '3DRTMA'}),
+    ('/ui_state', {'date': '2025-08-14', 'hour': 12, 'data_source': '3DRTMA', 'pressure_level': 500}),
+    ('/get_filtered_variables', {'date': '2025-08-14', 'hour': 12, 'data_source': 'RTMA'}),
+    ('/get_comparable_grids', {'date': '2025-08-14', 'hour': 12}),
+])
+def test_listing_endpoints_revalidate(listing_client, endpoint, body):
+    first = listing_client.post(endpoint, json=body)
+    assert first.status_code == 200
+    assert first.get_json()['success'] is True
+    etag, weak = first.get_etag()
+    assert etag and not weak
+    assert first.headers['Cache-Control'] == 'no-cache'
+
+    second = listing_client.post(endpoint, json=body, headers={'If-None-Match': f'"{etag}"'})
+    assert second.status_code == 304
+    assert second.data == b''
+    assert second.get_etag()[0] == etag
+    assert second.headers['Cache-Control'] == 'no-cache'
+
+    stale = listing_client.post(endpoint, json=body, headers={'If-None-Match': '"stale"'})
+    assert stale.status_code == 200
+    assert stale.get_json() == first.get_json()
+
+
+@pytest.fixture
+def head_calls(client, monkeypatch):
+    """Stub HEAD probes (overriding the client fixture): hour 13 is missing, everything else is published."""
+    calls = []
+    lock = threading.Lock()
+
+    def head_status(url):
+        with lock:
+            calls.append(url)
+        return 404 if '/13/' in url or 't13z' in url else 200
+
+    monkeypatch.setattr(app_module, '_head_status', head_status)
+    return calls
+
+
+def test_batch_availability_dedupes_and_keeps_order(client, head_calls):
+    probes = [
+        {'date': '2025-08-14', 'hour': 12},
+        {'date': '20250814', 'hour': '13'},
+        {'date': '2025-08-14', 'hour': '12'},
+        {'date': '2025-08-14', 'hour': 12, 'data_source': '3DRTMA'},
+    ]
+    response = client.post('/check_data_availability_batch', json={'probes': probes})
+    assert response.status_code == 200
+    results = response.get_json()['results']
+
+    assert [(r['date'], r['hour']) for r in results] == [(p['date'], p['hour']) for p in probes]
+    assert [r['available'] for r in results] == [True, False, True, True]
+    assert results[1]['error'] == 'HTTP 404'
+    assert results[0]['checked_url'] == results[2]['checked_url'] == app_module._index_url('20250814', 12, 'RTMA')
+    assert results[3]['checked_url'] == app_module._index_url('20250814', 12, '3DRTMA')
+    # The two probes for the same RTMA cycle share one HEAD request
+    assert sorted(head_calls) == sorted({r['checked_url'] for r in results})
+
+
+def test_batch_availability_marks_invalid_probes(client, head_calls):
+    probes = [
+        'not-a-probe',
+        {'date': '2025-08-14', 'hour': 'noon'},
+        {'date': '2025-08-14', 'hour': True},
+        {'date': '14/08/2025', 'hour': 12},
+        {'hour': 12},
+        {'date': '2025-08-14', 'hour': 12},
+    ]
+    response = client.post('/check_data_availability_batch', json={'probes': probes})
+    assert response.status_code == 200
+    results = response.get_json()['results']
+
+    assert len(results) == len(probes)
+    for result in results[:-1]:
+        assert result['available'] is False
+        assert result['error'] == 'Invalid date or hour'
+        assert 'checked_url' not in result
+    assert 'date' not in results[0]
+    assert results[1]['hour'] == 'noon'
+    assert results[-1]['available'] is True
+    assert head_calls == [results[-1]['checked_url']]
+
+
+@pytest.mark.parametrize('body', [{}, {'probes': []}, {'probes': {'date': '2025-08-14'}}, []])
+def test_batch_availability_requires_probe_list(client, head_calls, body):
+    response = client.post('/check_data_availability_batch', json=body)
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'probes must be a non-empty list'
+    assert head_calls == []
+
+
+def test_batch_availability_caps_probe_count(client, head_calls):
+    probe = {'date': '2025-08-14', 'hour': 12}
+    limit = app_module.MAX_BATCH_PROBES
+
+    response = client.post('/check_data_availability_batch', json={'probes': [probe] * (limit + 1)})
+    assert response.status_code == 400
+    assert response.get_json()['error'] == f'At most {limit} probes per request'
+    assert head_calls == []
+
+    response = client.post('/check_data_availability_batch', json={'probes': [probe] * limit})
+    assert response.status_code == 200
+    assert len(response.get_json()['results']) == limit
+    assert len(head_calls) == 1
+
+
+class _FakeMapGenerator:
+    """Writes a placeholder map page (or fails) and records each render."""
+
+    def __init__(self, succeed=True):
+        self.succeed = succeed
+        self.renders = []
+
+    def create_single_variable_weather_map(self, date_formatted, hour, output_path, variable, data_source, pressure_level):
+        self.renders.append((date_formatted, hour, variable, data_source, pressure_level))
+        if self.succeed:
+            with open(output_path, 'w') as f:
+                f.write('<html>map</html>')
+        return self.succeed
+
+
+@pytest.fixture
+def map_client(client, monkeypatch, tmp_path):
+    monkeypatch.setattr(app_module, 'STATIC_MAPS_DIR', str(tmp_path))
+    monkeypatch.setattr(app_module, 'MAPS_ACCEL_PREFIX', None)
+    return client
+
+
+MAP_QUERY = {'date': '2025-08-14', 'hour': '12', 'variable': 'TMP', 'data_source': '3DRTMA', 'pressure_level': '500'}
+
+
+def test_map_renders_once_and_serves_html(map_client, monkeypatch, tmp_path):
+    wg = _FakeMapGenerator()
+    monkeypatch.setattr(app_module, 'get_weather_generator', lambda: wg)
+
+    for _ in range(2):
+        response = map_client.get('/map', query_string=MAP_QUERY)
+        assert response.status_code == 200
+        assert response.mimetype == 'text/html'
+        assert response.data == b'<html>map</html>'
+        assert response.headers['Cache-Control'] == app_module.MAP_CACHE_CONTROL
+        response.close()
+
+    assert wg.renders == [('20250814', 12, 'TMP', '3DRTMA', 500)]
+    assert os.listdir(tmp_path) == ['weather_map_3DRTMA_TMP_500mb_20250814_12Z.html']
+
+
+def test_map_failure_returns_json_error(map_client, monkeypatch, tmp_path):
+    monkeypatch.setattr(app_module, 'get_weather_generator', lambda: _FakeMapGenerator(succeed=False))
+
+    response = map_client.get('/map', query_string=MAP_QUERY)
+    assert response.status_code == 500
+    assert response.get_json()['error'] == 'Failed to generate weather map'
+    assert os.listdir(tmp_path) == []
+
+
+def test_map_rejects_invalid_params_without_rendering(map_client, monkeypatch):
+    wg = _FakeMapGenerator()
+    monkeypatch.setattr(app_module, 'get_weather_generator', lambda: wg)
+
+    response = map_client.get('/map', query_string=dict(MAP_QUERY, hour='noon'))
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Invalid hour'
+    assert wg.renders == []
+
+
+def test_map_hands_delivery_to_nginx(map_client, monkeypatch):
+    monkeypatch.setattr(app_module, 'get_weather_generator', lambda: _FakeMapGenerator())
+    monkeypatch.setattr(app_module, 'MAPS_ACCEL_PREFIX', '/internal-maps/')
+
+    response = map_client.get('/map', query_string=MAP_QUERY)
+    assert response.status_code == 200
+    assert response.headers['X-Accel-Redirect'] == '/internal-maps/weather_map_3DRTMA_TMP_500mb_20250814_12Z.html'
+    assert response.data == b''
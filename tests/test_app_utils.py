@@ -1,11 +1,15 @@
 import os
 import sys
+import numpy as np
 import pytest
 
 # Ensure project root is on sys.path for imports when running pytest from tests/
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from app_utils import date_to_yyyymmdd, validate_pressure_level
+from app_utils import (
+    closest_level, date_to_yyyymmdd, extract_pressure_levels, nearest_grid_index, nearest_index, parse_int,
+    resample_to_grid, validate_pressure_level,
+)
 
 
 def test_date_to_yyyymmdd_accepts_yyyymmdd():
@@ -16,12 +20,25 @@ def test_date_to_yyyymmdd_accepts_dash_format():
     assert date_to_yyyymmdd('2025-08-14') == '20250814'
 
 
-@pytest.mark.parametrize('bad', ['', None, '2025/08/14', '2025081'])
+def test_date_to_yyyymmdd_accepts_unpadded_dash_format():
+    assert date_to_yyyymmdd('2025-8-4') == '20250804'
+
+
+@pytest.mark.parametrize('bad', ['', None, '2025/08/14', '2025081', '2025-02-30', '2025-1a-14', ['2025-08-14']])
 def test_date_to_yyyymmdd_rejects_bad(bad):
     with pytest.raises(ValueError):
         date_to_yyyymmdd(bad)
 
 
+@pytest.mark.parametrize('value, expected', [
+    (12, 12), ('12', 12), (' 850 ', 850), ('-3', -3), ('+7', 7), (12.0, 12),
+    ('', None), ('-', None), ('12.3', None), ('1e3', None), ('abc', None), (None, None), (float('nan'), None), ([12], None),
+    (True, None), (False, None),
+])
+def test_parse_int(value, expected):
+    assert parse_int(value) == expected
+
+
 def test_validate_pressure_level_accepts_int_and_str():
     assert validate_pressure_level(500) == 500
     assert validate_pressure_level('850') == 850
@@ -31,3 +48,50 @@ def test_validate_pressure_level_accepts_int_and_str():
 def test_validate_pressure_level_rejects_bad(bad):
     with pytest.raises(ValueError):
         validate_pressure_level(bad)
+
+
+def test_extract_pressure_levels():
+    levels = ['500 mb', '850 MB', '1000 mb', '500 mb', ' 925 ', '2 m above ground', 'surface', None, '']
+    assert extract_pressure_levels(levels) == [500, 850, 925, 1000]
+
+
+def test_closest_level():
+    targets = (1000, 925, 850, 700)
+    assert closest_level([200, 500, 700, 850], targets) == 700
+    assert closest_level([300, 400, 500], targets) == 500
+    # ties (912 is 13 mb from 925, 1013 is 13 mb from 1000) go to the earlier level
+    assert closest_level([912, 1013], targets) == 912
+    assert closest_level([], targets) is None
+
+
+def test_nearest_index_matches_argmin():
+    values = np.array([-3.0, -1.0, 0.5, 2.0, 2.5, 7.0])
+    targets = np.array([-10.0, -2.0, -1.0, 0.0, 1.25, 2.25, 6.0, 100.0])
+    expected = [int(np.argmin(np.abs(values - t))) for t in targets]
+    assert nearest_index(values, targets).tolist() == expected
+
+
+@pytest.mark.parametrize('rotation', [0.0, 0.3])
+def test_nearest_grid_index_matches_brute_force(rotation):
+    # A rotated (curvilinear in lat/lon terms) grid, with rows not of constant latitude
+    rows, cols = np.meshgrid(np.arange(70.0), np.arange(90.0), indexing='ij')
+    lat_grid = 25.0 + 0.3 * (rows * np.cos(rotation) + cols * np.sin(rotation))
+    lon_grid = -120.0 + 0.3 * (cols * np.cos(rotation) - rows * np.sin(rotation))
+    for lat, lon in [(30.1, -110.2), (40.0, -100.0), (20.0, -130.0), (50.0, -80.0)]:
+        dist = (lat_grid - lat) ** 2 + ((lon_grid - lon) * np.cos(np.radians(lat))) ** 2
+        expected = np.unravel_index(int(np.argmin(dist)), dist.shape)
+        assert nearest_grid_index(lat_grid, lon_grid, lat, lon) == expected
+
+
+def test_resample_to_grid_nearest_neighbor():
+    src_lat, src_lon = np.meshgrid(np.arange(5.0), np.arange(4.0), indexing='ij')
+    src = src_lat * 10 + src_lon
+    tgt_lat, tgt_lon = np.meshgrid([0.2, 2.6, 9.0], [-1.0, 1.4, 3.0], indexing='ij')
+    out = resample_to_grid(src, src_lat, src_lon, tgt_lat, tgt_lon)
+    assert out.tolist() == [[0.0, 1.0, 3.0], [30.0, 31.0, 33.0], [40.0, 41.0, 43.0]]
+
+
+def test_resample_to_grid_keeps_float32():
+    src_lat, src_lon = np.meshgrid(np.arange(3.0), np.arange(3.0), indexing='ij')
+    src = (src_lat + src_lon).astype(np.float32)
+    assert resample_to_grid(src, src_lat, src_lon, src_lat, src_lon).dtype == np.float32
@@ -0,0 +1,298 @@
+import base64
+import io
+import os
+import sys
+import types
+
+import numpy as np
+import pytest
+from PIL import Image
+
+# Ensure project root is on sys.path for imports when running pytest from tests/
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# The decode tests below swap in a fake eccodes; a placeholder lets the module import without it
+try:
+    import eccodes  # noqa: F401
+except ImportError:
+    sys.modules['eccodes'] = types.ModuleType('eccodes')
+
+import weather_map
+from weather_config import WeatherMapConfig
+
+
+def _renderer(width, height, **overrides):
+    config = WeatherMapConfig()
+    config.FIGURE_SIZE = (width, height)
+    config.FIGURE_DPI = 1
+    for name, value in overrides.items():
+        setattr(config, name, value)
+    return weather_map.WeatherMapRenderer(config)
+
+
+def _grid(n_lat=5, n_lon=10):
+    """Regular 1-degree grid, north row first, so raster pixel (y, x) lines up with data[y, x]."""
+    lon_grid, lat_grid = np.meshgrid(np.arange(n_lon, dtype=float), np.arange(n_lat - 1, -1, -1, dtype=float))
+    return lon_grid, lat_grid
+
+
+def _overlay(renderer, data, levels, **kwargs):
+    lon_grid, lat_grid = _grid(*data.shape)
+    png = renderer.create_contour_overlay(lon_grid, lat_grid, data, levels=levels, return_bytes=True, **kwargs)
+    return Image.open(io.BytesIO(png))
+
+
+def test_contour_overlay_bands_include_first_and_last_level():
+    data = np.full((5, 10), 1.5)
+    data[0, 0] = 0.0
+    data[0, 1] = 3.0
+    img = _overlay(_renderer(10, 5), data, np.array([0.0, 1.0, 2.0, 3.0]))
+    assert img.mode == 'P'
+    bands = np.asarray(img)
+    assert bands[0, 0] == 1
+    assert bands[0, 1] == 3
+    assert bands[2, 5] == 2
+
+
+def test_contour_overlay_masked_points_stay_transparent():
+    data = np.full((5, 10), 1.5)
+    data[2, 5] = np.nan
+    data[0, 0] = -1.0
+    data[4, 9] = 4.0
+    img = _overlay(_renderer(10, 5), data, np.array([0.0, 1.0, 2.0, 3.0]))
+    bands = np.asarray(img)
+    alpha = np.asarray(img.convert('RGBA'))[..., 3]
+    for y, x in ((2, 5), (0, 0), (4, 9)):
+        assert bands[y, x] == 0
+        assert alpha[y, x] == 0
+    assert alpha[1, 1] == round(0.6 * 255)
+
+
+def test_contour_overlay_fills_gaps_but_not_masked_points():
+    # Twice as many raster columns as grid columns leaves every other column without a grid point
+    data = np.full((5, 10), 1.5)
+    data[2, 5] = np.nan
+    bands = np.asarray(_overlay(_renderer(19, 5), data, np.array([0.0, 1.0, 2.0, 3.0])))
+    assert bands[1, 1] == 2
+    assert bands[2, 10] == 0  # the NaN point itself
+    assert bands[2, 9] == 2 and bands[2, 11] == 2  # gap pixels beside it take the band of a valid neighbour
+
+
+def test_contour_overlay_falls_back_to_rgba():
+    data = np.linspace(0, 1, 50).reshape(5, 10)
+    assert _overlay(_renderer(10, 5), data, np.linspace(0, 1, 300)).mode == 'RGBA'
+    assert _overlay(_renderer(10, 5, OVERLAY_PALETTE_COLORS=0), data, np.linspace(0, 1, 5)).mode == 'RGBA'
+
+
+def test_contour_overlay_return_bytes():
+    renderer = _renderer(10, 5)
+    lon_grid, lat_grid = _grid()
+    data = np.linspace(0, 1, 50).reshape(5, 10)
+    png = renderer.create_contour_overlay(lon_grid, lat_grid, data, return_bytes=True)
+    assert png.startswith(b'\x89PNG')
+    encoded = renderer.create_contour_overlay(lon_grid, lat_grid, data)
+    assert base64.b64decode(encoded) == png
+
+
+def _processor(**overrides):
+    config = WeatherMapConfig()
+    config.GRIB_CACHE_DIR = ''
+    for name, value in overrides.items():
+        setattr(config, name, value)
+    return weather_map.GRIBDataProcessor(config)
+
+
+def _records(*ranges):
+    return [{'variable': f'V{i}', 'byte_start': start, 'byte_end': end} for i, (start, end) in enumerate(ranges)]
+
+
+def _span_members(spans):
+    return [(start, end, [r['variable'] for r in members]) for start, end, members in spans]
+
+
+def test_coalesce_ranges_merges_adjacent_records():
+    spans = _processor()._coalesce_ranges(_records((0, 999), (1000, 1999)))
+    assert _span_members(spans) == [(0, 1999, ['V0', 'V1'])]
+
+
+@pytest.mark.parametrize('gap, merged', [(100, True), (101, False)])
+def test_coalesce_ranges_gap_threshold(gap, merged):
+    spans = _processor(RANGE_COALESCE_GAP=100)._coalesce_ranges(_records((0, 999), (1000 + gap, 1999 + gap)))
+    assert len(spans) == (1 if merged else 2)
+
+
+def test_coalesce_ranges_splits_at_max_bytes():
+    processor = _processor(RANGE_COALESCE_MAX_BYTES=2000)
+    spans = processor._coalesce_ranges(_records((0, 999), (1000, 1999), (2000, 2999)))
+    assert _span_members(spans) == [(0, 1999, ['V0', 'V1']), (2000, 2999, ['V2'])]
+
+
+def test_coalesce_ranges_sorts_input():
+    spans = _processor()._coalesce_ranges(_records((1000, 1999), (0, 999)))
+    assert _span_members(spans) == [(0, 1999, ['V1', 'V0'])]
+
+
+def test_coalesce_ranges_open_ended_last_record():
+    records = _records((0, 999), (1000, None))
+    assert _span_members(_processor()._coalesce_ranges(records)) == [(0, None, ['V0', 'V1'])]
+    # Its size is unknown, so it only joins a span it starts within the cap of
+    split = _processor(RANGE_COALESCE_MAX_BYTES=1000)._coalesce_ranges(records)
+    assert _span_members(split) == [(0, 999, ['V0']), (1000, None, ['V1'])]
+
+
+def test_span_slice_recovers_each_record():
+    blob = bytes(range(256)) * 20
+    records = _records((10, 999), (1000, 2999), (3050, None))
+    for span_start, span_end, members in _processor(RANGE_COALESCE_GAP=100)._coalesce_ranges(records):
+        span_data = blob[span_start:span_end + 1 if span_end is not None else None]
+        for record in members:
+            end = record['byte_end']
+            expected = blob[record['byte_start']:end + 1 if end is not None else None]
+            assert weather_map.GRIBDataProcessor._span_slice(span_data, span_start, record) == expected
+
+
+class _FakeResponse:
+    def __init__(self, content):
+        self.content = content
+
+    def raise_for_status(self):
+        pass
+
+
+def _cached_processor(monkeypatch, cache_dir, **overrides):
+    """Processor whose session serves deterministic bytes per Range start and counts GETs."""
+    processor = _processor(GRIB_CACHE_DIR=str(cache_dir), **overrides)
+    gets = []
+
+    def fake_get(url, headers=None, timeout=None):
+        start = int(headers['Range'][len('bytes='):].split('-')[0])
+        gets.append(start)
+        return _FakeResponse(bytes([start % 256]) * 1000)
+
+    monkeypatch.setattr(processor.session, 'get', fake_get)
+    return processor, gets
+
+
+def test_grib_cache_hit_and_miss(monkeypatch, tmp_path):
+    processor, gets = _cached_processor(monkeypatch, tmp_path)
+    first = processor.download_grib_subset('https://example/a.grib2', 1, 1000)
+    second = processor.download_grib_subset('https://example/a.grib2', 1, 1000)
+    assert first == second == bytes([1]) * 1000
+    assert gets == [1]
+    processor.download_grib_subset('https://example/a.grib2', 2, 1001)
+    assert gets == [1, 2]
+    assert len(list(tmp_path.glob('*.grib2'))) == 2
+
+
+def test_grib_cache_removes_partial_file_on_failed_write(monkeypatch, tmp_path):
+    processor, gets = _cached_processor(monkeypatch, tmp_path)
+
+    def failing_replace(src, dst):
+        raise OSError('disk full')
+
+    monkeypatch.setattr(weather_map.os, 'replace', failing_replace)
+    assert processor.download_grib_subset('https://example/a.grib2', 1, 1000) == bytes([1]) * 1000
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_grib_cache_prunes_least_recently_used(monkeypatch, tmp_path):
+    processor, gets = _cached_processor(monkeypatch, tmp_path, GRIB_CACHE_MAX_BYTES=2500)
+    url = 'https://example/a.grib2'
+    processor.download_grib_subset(url, 1, 1000)
+    processor.download_grib_subset(url, 2, 1001)
+    os.utime(processor._grib_cache_path(url, 1, 1000), (100, 100))
+    os.utime(processor._grib_cache_path(url, 2, 1001), (200, 200))
+    processor.download_grib_subset(url, 1, 1000)  # hit: now the most recently used
+    processor.download_grib_subset(url, 3, 1002)  # third entry crosses the cap
+    assert os.path.exists(processor._grib_cache_path(url, 1, 1000))
+    assert not os.path.exists(processor._grib_cache_path(url, 2, 1001))
+    assert os.path.exists(processor._grib_cache_path(url, 3, 1002))
+    assert processor._grib_cache_bytes == 2000
+
+
+def test_grib_cache_disabled_by_empty_dir(monkeypatch, tmp_path):
+    processor, gets = _cached_processor(monkeypatch, '')
+    assert processor._grib_cache_path('https://example/a.grib2', 1, 1000) is None
+    processor.download_grib_subset('https://example/a.grib2', 1, 1000)
+    processor.download_grib_subset('https://example/a.grib2', 1, 1000)
+    assert gets == [1, 1]
+
+
+class _FakeEccodes:
+    """Serves one 2x3 GRIB message: a bitmapped missing point and 0-360 longitudes."""
+
+    def __init__(self, grid_md5='grid-a'):
+        self.grid_md5 = grid_md5
+        self.array_calls = []
+        self.released = []
+
+    def codes_new_from_message(self, buf):
+        assert isinstance(buf, bytes)
+        return 7
+
+    def codes_get(self, gid, key):
+        return {'Nj': 2, 'Ni': 3, 'bitmapPresent': 1, 'missingValue': 9999}[key]
+
+    def codes_get_string(self, gid, key):
+        assert key == 'md5GridSection'
+        return self.grid_md5
+
+    def codes_get_array(self, gid, key):
+        self.array_calls.append(key)
+        return {
+            'values': np.array([1.0, 2.0, 9999.0, 4.0, 5.0, 6.0]),
+            'latitudes': np.array([30.0, 30.0, 30.0, 31.0, 31.0, 31.0]),
+            'longitudes': np.array([250.0, 251.0, 252.0, 250.0, 251.0, 252.0]),
+        }[key]
+
+    def codes_release(self, gid):
+        self.released.append(gid)
+
+
+def test_decode_grib_message(monkeypatch):
+    fake = _FakeEccodes()
+    monkeypatch.setattr(weather_map, 'eccodes', fake)
+    values, coords = _processor()._decode_grib_message(b'GRIB')
+    assert values.shape == (2, 3)
+    assert np.isnan(values[0, 2])
+    assert values[1, 0] == 4.0
+    assert coords['lat_grid'].shape == coords['lon_grid'].shape == (2, 3)
+    assert coords['lat_grid'].dtype == coords['lon_grid'].dtype == np.float32
+    assert coords['lon_grid'][0, 0] == -110.0
+    assert coords['bounds'] == [[30.0, -110.0], [31.0, -108.0]]
+    assert fake.released == [7]
+
+
+def test_decode_grib_message_reuses_coordinates_per_grid(monkeypatch):
+    fake = _FakeEccodes()
+    monkeypatch.setattr(weather_map, 'eccodes', fake)
+    processor = _processor()
+    _, first = processor._decode_grib_message(b'GRIB')
+    fake.array_calls.clear()
+    _, second = processor._decode_grib_message(b'GRIB')
+    assert second is first
+    assert fake.array_calls == ['values']
+    fake.grid_md5 = 'grid-b'
+    processor._decode_grib_message(b'GRIB')
+    assert 'latitudes' in fake.array_calls
+
+
+def test_fetch_grib_inventory_parses_idx(monkeypatch):
+    idx = (
+        b'1:0:d=2025081412:PRES:surface:anl:\n'
+        b'2:1228799:d=2025081412:TMP:2 m above ground:anl:\n'
+        b'not an index line\n'
+        b'3:2618456:d=2025081412:DPT:2 m above ground:anl:\n'
+        b'4:3940012:d=2025081412:UGRD:10 m above ground:anl:\n'
+    )
+    processor = _processor()
+    monkeypatch.setattr(processor.session, 'get', lambda url, timeout=None: _FakeResponse(idx))
+    inventory = processor._fetch_grib_inventory('https://example/a.grib2.idx')
+    assert [r['record'] for r in inventory] == [1, 2, 3, 4]
+    assert [(r['byte_start'], r['byte_end']) for r in inventory] == [
+        (0, 1228798), (1228799, 2618455), (2618456, 3940011), (3940012, None),
+    ]
+    assert inventory[1]['variable'] == 'TMP'
+    assert inventory[1]['level'] == '2 m above ground'
+    assert inventory[1]['forecast_time'] == 'anl'
+    assert inventory[3]['full_line'] == '4:3940012:d=2025081412:UGRD:10 m above ground:anl:'
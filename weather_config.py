@@ -0,0 +1,134 @@
+"""Data source, variable and rendering settings for the weather map generator.
+
+Kept free of heavy imports (xarray, matplotlib, folium) so the web app can read URL
+patterns and variable metadata without loading the GRIB stack.
+"""
+
+import os
+
+
+class WeatherMapConfig:
+    """Configuration class for weather map generation."""
+    
+    # Data source configurations
+    DATA_SOURCES = {
+        'RTMA': {
+            'name': 'RTMA 2.5km Surface',
+            'base_url': 'https://noaa-rtma-pds.s3.amazonaws.com',
+            'grib_pattern': '{base_url}/rtma2p5.{date}/rtma2p5.t{hour:02d}z.2dvaranl_ndfd.grb2_wexp',
+            'idx_pattern': '{base_url}/rtma2p5.{date}/rtma2p5.t{hour:02d}z.2dvaranl_ndfd.grb2_wexp.idx',
+            'has_pressure_levels': False
+        },
+        'RTMA-PRES': {
+            'name': 'RTMA 2.5km Pressure Levels', 
+            'base_url': 'https://noaa-rtma-pds.s3.amazonaws.com',
+            'grib_pattern': '{base_url}/rtma2p5.{date}/rtma2p5.t{hour:02d}z.3dvaranl_ndfd.grb2_wexp',
+            'idx_pattern': '{base_url}/rtma2p5.{date}/rtma2p5.t{hour:02d}z.3dvaranl_ndfd.grb2_wexp.idx',
+            'has_pressure_levels': True
+        },
+        '3DRTMA': {
+            'name': '3D-RTMA Pressure Levels',
+            'base_url': 'https://noaa-nws-3drtma-pds.s3.amazonaws.com',
+            'grib_pattern': '{base_url}/3drtma/results/rtma_a/rtma3d_hrrr.v1.0.0/prod/rtma3d.{date}/{hour:02d}/rtma3d.t{hour:02d}z.anl_prslev_ndfd.grib2',
+            'idx_pattern': '{base_url}/3drtma/results/rtma_a/rtma3d_hrrr.v1.0.0/prod/rtma3d.{date}/{hour:02d}/rtma3d.t{hour:02d}z.anl_prslev_ndfd.grib2.idx',
+            'has_pressure_levels': True
+        }
+    }
+    
+    # Default data source
+    DEFAULT_DATA_SOURCE = 'RTMA'
+    
+    # Legacy properties for backward compatibility
+    @property
+    def BASE_URL(self):
+        return self.DATA_SOURCES[self.DEFAULT_DATA_SOURCE]['base_url']
+    
+    @property 
+    def GRIB_PATTERN(self):
+        return self.DATA_SOURCES[self.DEFAULT_DATA_SOURCE]['grib_pattern']
+    
+    @property
+    def IDX_PATTERN(self):
+        return self.DATA_SOURCES[self.DEFAULT_DATA_SOURCE]['idx_pattern']
+    
+    # Variable definitions
+    VARIABLE_INFO = {
+        'GUST': {'name': 'Wind Gust', 'units': 'mph', 'multiplier': 2.237, 'cmap': 'YlOrRd'},
+        'UGRD': {'name': 'U-Component Wind', 'units': 'mph', 'multiplier': 2.237, 'cmap': 'RdBu_r'},
+        'VGRD': {'name': 'V-Component Wind', 'units': 'mph', 'multiplier': 2.237, 'cmap': 'RdBu_r'},
+        'WIND': {'name': 'Wind Speed', 'units': 'mph', 'multiplier': 2.237, 'cmap': 'plasma'},
+        'TMP': {'name': 'Temperature', 'units': '°F', 'multiplier': 1.8, 'offset': -459.67, 'cmap': 'RdYlBu_r'},
+        'DPT': {'name': 'Dew Point', 'units': '°F', 'multiplier': 1.8, 'offset': -459.67, 'cmap': 'Blues'},
+        'RH': {'name': 'Relative Humidity', 'units': '%', 'multiplier': 1, 'cmap': 'Blues'},
+        'PRES': {'name': 'Pressure', 'units': 'hPa', 'multiplier': 0.01, 'cmap': 'viridis'},
+        'PRMSL': {'name': 'Sea Level Pressure', 'units': 'hPa', 'multiplier': 0.01, 'cmap': 'viridis'},
+        'APCP': {'name': 'Precipitation', 'units': 'mm', 'multiplier': 1, 'cmap': 'Blues'},
+        'VIS': {'name': 'Visibility', 'units': 'km', 'multiplier': 0.001, 'cmap': 'viridis'},
+        'TCDC': {'name': 'Total Cloud Cover', 'units': '%', 'multiplier': 1, 'cmap': 'gray'},
+        'HGT': {'name': 'Geopotential Height', 'units': 'm', 'multiplier': 1, 'cmap': 'terrain'},
+    }
+    
+    # Pressure levels available in 3DRTMA data
+    PRESSURE_LEVELS = [
+        50, 75, 100, 125, 150, 175, 200, 225, 250, 275, 300, 325, 350, 375, 400, 
+        425, 450, 475, 500, 525, 550, 575, 600, 625, 650, 675, 700, 725, 750, 
+        775, 800, 825, 850, 875, 900, 925, 950, 975, 1000
+    ]
+    
+    # Common pressure levels with names
+    COMMON_PRESSURE_LEVELS = {
+        0: 'Surface Level',
+        50: '50 mb (~20 km, Lower Stratosphere)',
+        100: '100 mb (~16 km, Tropopause)',
+        200: '200 mb (~12 km, Upper Troposphere)', 
+        300: '300 mb (~9 km, Jet Stream Level)',
+        500: '500 mb (~5.5 km, Mid-Troposphere)',
+        700: '700 mb (~3 km, Lower Troposphere)',
+        850: '850 mb (~1.5 km, Boundary Layer)',
+        925: '925 mb (~750 m, Near Surface)',
+        1000: '1000 mb (Sea Level)'
+    }
+    
+    # Map settings
+    DEFAULT_ZOOM = 6
+    DEFAULT_OPACITY = 0.6
+    CONTOUR_LEVELS = 20
+    
+    # Parsed GRIB index files are reused for this many seconds
+    INVENTORY_CACHE_TTL = 3600
+    INVENTORY_CACHE_SIZE = 256
+    
+    # load_all_variables fetches neighbouring GRIB messages with one Range GET when the
+    # gap between them is at most RANGE_COALESCE_GAP bytes, up to RANGE_COALESCE_MAX_BYTES per GET
+    RANGE_COALESCE_GAP = 64 * 1024
+    RANGE_COALESCE_MAX_BYTES = 16 * 1024 * 1024
+    
+    # Downloaded GRIB byte ranges are kept on disk so restarts and repeat runs skip S3
+    # (published analyses do not change). The oldest-used files are pruned past the size cap.
+    # Set GRIB_CACHE_DIR to an empty string to disable.
+    GRIB_CACHE_DIR = os.environ.get('GRIB_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'grib'))
+    GRIB_CACHE_MAX_BYTES = 2 * 1024 ** 3
+    
+    # Decoded single-variable grids (data + coordinates) are reused for this many seconds.
+    # A full CONUS grid with coordinates is on the order of 100 MB, so keep the count small.
+    VARIABLE_CACHE_TTL = 1800
+    VARIABLE_CACHE_SIZE = 8
+    
+    # Outbound HTTP identification (Nominatim's usage policy requires a descriptive agent)
+    HTTP_USER_AGENT = '3drtma-viewer/1.0 (github:m-wessler)'
+    # Range downloads run concurrently from several web threads; requests' default pool keeps 10
+    HTTP_POOL_SIZE = 32
+    
+    # Figure settings
+    FIGURE_SIZE = (12, 8)
+    FIGURE_DPI = 150
+    
+    # Overlay PNGs are written as 8-bit palette images, one entry per contour band
+    # (visually lossless and roughly half the PNG/base64 payload of RGBA). Set to 0
+    # to keep full RGBA output; more than 255 bands always falls back to RGBA.
+    OVERLAY_PALETTE_COLORS = 256
+    
+    # Tunable behavior: whether folium-generated maps should inject their own
+    # control panels. Set to False when embedding maps in an outer UI that
+    # provides controls (the preferred lightweight approach).
+    INJECT_FOLIUM_CONTROL_PANEL = False
@@ -6,10 +6,10 @@ A Python script to create interactive weather maps from NOAA RTMA GRIB2 data.
 Downloads meteorological data and generates HTML maps with multiple variable overlays.
 
 Usage:
-    python weather_map_generator.py [options]
+    python weather_map.py [options]
 
 Example:
-    python weather_map_generator.py --date 20250801 --hour 12 --output weather_map.html
+    python weather_map.py --date 20250801 --hour 12 --output weather_map.html
 """
 
 import argparse
@@ -17,25 +17,29 @@ import logging
 import sys
 import os
 import json
-import tempfile
 import io
 import base64
+import functools
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple, Any
 
+import eccodes
 import xarray as xr
 import numpy as np
-import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from cachetools import TTLCache
 import folium
 import matplotlib
-matplotlib.use('Agg')  # Use non-interactive backend to avoid threading issues
-import matplotlib.pyplot as plt
-import matplotlib.colors as mcolors
-from folium import plugins
 from PIL import Image
 
+from weather_config import WeatherMapConfig
+
 
 # Configure logging
 logging.basicConfig(
@@ -45,101 +49,10 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-class WeatherMapConfig:
-    """Configuration class for weather map generation."""
-    
-    # Data source configurations
-    DATA_SOURCES = {
-        'RTMA': {
-            'name': 'RTMA 2.5km Surface',
-            'base_url': 'https://noaa-rtma-pds.s3.amazonaws.com',
-            'grib_pattern': '{base_url}/rtma2p5.{date}/rtma2p5.t{hour:02d}z.2dvaranl_ndfd.grb2_wexp',
-            'idx_pattern': '{base_url}/rtma2p5.{date}/rtma2p5.t{hour:02d}z.2dvaranl_ndfd.grb2_wexp.idx',
-            'has_pressure_levels': False
-        },
-        'RTMA-PRES': {
-            'name': 'RTMA 2.5km Pressure Levels', 
-            'base_url': 'https://noaa-rtma-pds.s3.amazonaws.com',
-            'grib_pattern': '{base_url}/rtma2p5.{date}/rtma2p5.t{hour:02d}z.3dvaranl_ndfd.grb2_wexp',
-            'idx_pattern': '{base_url}/rtma2p5.{date}/rtma2p5.t{hour:02d}z.3dvaranl_ndfd.grb2_wexp.idx',
-            'has_pressure_levels': True
-        },
-        '3DRTMA': {
-            'name': '3D-RTMA Pressure Levels',
-            'base_url': 'https://noaa-nws-3drtma-pds.s3.amazonaws.com',
-            'grib_pattern': '{base_url}/3drtma/results/rtma_a/rtma3d_hrrr.v1.0.0/prod/rtma3d.{date}/{hour:02d}/rtma3d.t{hour:02d}z.anl_prslev_ndfd.grib2',
-            'idx_pattern': '{base_url}/3drtma/results/rtma_a/rtma3d_hrrr.v1.0.0/prod/rtma3d.{date}/{hour:02d}/rtma3d.t{hour:02d}z.anl_prslev_ndfd.grib2.idx',
-            'has_pressure_levels': True
-        }
-    }
-    
-    # Default data source
-    DEFAULT_DATA_SOURCE = 'RTMA'
-    
-    # Legacy properties for backward compatibility
-    @property
-    def BASE_URL(self):
-        return self.DATA_SOURCES[self.DEFAULT_DATA_SOURCE]['base_url']
-    
-    @property 
-    def GRIB_PATTERN(self):
-        return self.DATA_SOURCES[self.DEFAULT_DATA_SOURCE]['grib_pattern']
-    
-    @property
-    def IDX_PATTERN(self):
-        return self.DATA_SOURCES[self.DEFAULT_DATA_SOURCE]['idx_pattern']
-    
-    # Variable definitions
-    VARIABLE_INFO = {
-        'GUST': {'name': 'Wind Gust', 'units': 'mph', 'multiplier': 2.237, 'cmap': 'YlOrRd'},
-        'UGRD': {'name': 'U-Component Wind', 'units': 'mph', 'multiplier': 2.237, 'cmap': 'RdBu_r'},
-        'VGRD': {'name': 'V-Component Wind', 'units': 'mph', 'multiplier': 2.237, 'cmap': 'RdBu_r'},
-        'WIND': {'name': 'Wind Speed', 'units': 'mph', 'multiplier': 2.237, 'cmap': 'plasma'},
-        'TMP': {'name': 'Temperature', 'units': '°F', 'multiplier': 1.8, 'offset': -459.67, 'cmap': 'RdYlBu_r'},
-        'DPT': {'name': 'Dew Point', 'units': '°F', 'multiplier': 1.8, 'offset': -459.67, 'cmap': 'Blues'},
-        'RH': {'name': 'Relative Humidity', 'units': '%', 'multiplier': 1, 'cmap': 'Blues'},
-        'PRES': {'name': 'Pressure', 'units': 'hPa', 'multiplier': 0.01, 'cmap': 'viridis'},
-        'PRMSL': {'name': 'Sea Level Pressure', 'units': 'hPa', 'multiplier': 0.01, 'cmap': 'viridis'},
-        'APCP': {'name': 'Precipitation', 'units': 'mm', 'multiplier': 1, 'cmap': 'Blues'},
-        'VIS': {'name': 'Visibility', 'units': 'km', 'multiplier': 0.001, 'cmap': 'viridis'},
-        'TCDC': {'name': 'Total Cloud Cover', 'units': '%', 'multiplier': 1, 'cmap': 'gray'},
-        'HGT': {'name': 'Geopotential Height', 'units': 'm', 'multiplier': 1, 'cmap': 'terrain'},
-    }
-    
-    # Pressure levels available in 3DRTMA data
-    PRESSURE_LEVELS = [
-        50, 75, 100, 125, 150, 175, 200, 225, 250, 275, 300, 325, 350, 375, 400, 
-        425, 450, 475, 500, 525, 550, 575, 600, 625, 650, 675, 700, 725, 750, 
-        775, 800, 825, 850, 875, 900, 925, 950, 975, 1000
-    ]
-    
-    # Common pressure levels with names
-    COMMON_PRESSURE_LEVELS = {
-        0: 'Surface Level',
-        50: '50 mb (~20 km, Lower Stratosphere)',
-        100: '100 mb (~16 km, Tropopause)',
-        200: '200 mb (~12 km, Upper Troposphere)', 
-        300: '300 mb (~9 km, Jet Stream Level)',
-        500: '500 mb (~5.5 km, Mid-Troposphere)',
-        700: '700 mb (~3 km, Lower Troposphere)',
-        850: '850 mb (~1.5 km, Boundary Layer)',
-        925: '925 mb (~750 m, Near Surface)',
-        1000: '1000 mb (Sea Level)'
-    }
-    
-    # Map settings
-    DEFAULT_ZOOM = 6
-    DEFAULT_OPACITY = 0.6
-    CONTOUR_LEVELS = 20
-    
-    # Figure settings
-    FIGURE_SIZE = (12, 8)
-    FIGURE_DPI = 150
-    
-    # Tunable behavior: whether folium-generated maps should inject their own
-    # control panels. Set to False when embedding maps in an outer UI that
-    # provides controls (the preferred lightweight approach).
-    INJECT_FOLIUM_CONTROL_PANEL = False
+@functools.lru_cache(maxsize=None)
+def _colormap_lut(cmap: str) -> np.ndarray:
+    """256-entry RGBA uint8 lookup table for a Matplotlib colormap name."""
+    return (matplotlib.colormaps[cmap](np.linspace(0, 1, 256)) * 255).round().astype(np.uint8)
 
 
 class GRIBDataProcessor:
@@ -148,60 +61,160 @@ class GRIBDataProcessor:
     def __init__(self, config: WeatherMapConfig):
         self.config = config
         self.session = requests.Session()
+        # GRIB2 payloads are already packed; skip the gzip negotiation on every range request
+        self.session.headers.update({'User-Agent': config.HTTP_USER_AGENT, 'Accept-Encoding': 'identity'})
+        self.session.mount('https://', HTTPAdapter(
+            pool_maxsize=config.HTTP_POOL_SIZE,
+            max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504],
+                              raise_on_status=False),
+        ))
+        self._inventory_cache = TTLCache(maxsize=config.INVENTORY_CACHE_SIZE, ttl=config.INVENTORY_CACHE_TTL)
+        self._inventory_lock = threading.Lock()
+        self._variable_cache = TTLCache(maxsize=config.VARIABLE_CACHE_SIZE, ttl=config.VARIABLE_CACHE_TTL)
+        self._variable_lock = threading.Lock()
+        # Coordinate grids keyed by GRIB md5GridSection; every message on a grid shares one entry
+        self._coord_cache: Dict[str, Dict[str, np.ndarray]] = {}
+        self._coord_lock = threading.Lock()
+        # On-disk GRIB range cache; its total size is tracked here so writes only rescan
+        # the directory when a prune is actually due
+        self._grib_cache_dir = config.GRIB_CACHE_DIR or None
+        self._grib_cache_bytes = 0
+        self._grib_cache_lock = threading.Lock()
+        if self._grib_cache_dir:
+            os.makedirs(self._grib_cache_dir, exist_ok=True)
+            self._grib_cache_bytes = sum(size for _, size, _ in self._grib_cache_entries())
         
     def get_grib_inventory(self, idx_url: str) -> List[Dict[str, Any]]:
-        """Parse GRIB2 index file to find all variables."""
+        """Parse GRIB2 index file to find all variables.
+
+        Successful parses are cached per index URL; failures are not cached.
+        """
+        return self._cached_inventory(idx_url)[0]
+
+    def get_inventory_by_variable(self, idx_url: str) -> Dict[str, List[Dict[str, Any]]]:
+        """Inventory records grouped by variable name, in file order (cached with the inventory)."""
+        return self._cached_inventory(idx_url)[1]
+
+    def _cached_inventory(self, idx_url: str) -> Tuple[List[Dict[str, Any]], Dict[str, List[Dict[str, Any]]]]:
+        with self._inventory_lock:
+            entry = self._inventory_cache.get(idx_url)
+        if entry is not None:
+            return entry
+        inventory = self._fetch_grib_inventory(idx_url)
+        by_variable: Dict[str, List[Dict[str, Any]]] = {}
+        for record in inventory:
+            by_variable.setdefault(record['variable'], []).append(record)
+        entry = (inventory, by_variable)
+        with self._inventory_lock:
+            self._inventory_cache[idx_url] = entry
+        return entry
+
+    def _fetch_grib_inventory(self, idx_url: str) -> List[Dict[str, Any]]:
+        """Download and parse a GRIB2 index file."""
         try:
-            logger.info(f"Fetching GRIB inventory from: {idx_url}")
+            logger.info("Fetching GRIB inventory from: %s", idx_url)
             response = self.session.get(idx_url, timeout=30)
             response.raise_for_status()
             
-            lines = response.text.strip().split('\n')
-            inventory = []
+            # One split per line; each record ends where the next one starts (the last runs to EOF)
+            rows = [(line, line.split(':', 6)) for line in response.content.decode('utf-8', errors='replace').splitlines()]
+            rows = [(line, parts) for line, parts in rows if len(parts) == 7]
+            starts = [int(parts[1]) for _, parts in rows]
+            ends = [start - 1 for start in starts[1:]] + [None]
             
-            for i, line in enumerate(lines):
-                parts = line.split(':')
-                if len(parts) >= 7:
-                    record_num = int(parts[0])
-                    byte_start = int(parts[1])
-                    
-                    # Get byte end from next record or file size
-                    if i < len(lines) - 1:
-                        next_parts = lines[i + 1].split(':')
-                        byte_end = int(next_parts[1]) - 1
-                    else:
-                        byte_end = None
-                    
-                    inventory.append({
-                        'record': record_num,
-                        'byte_start': byte_start,
-                        'byte_end': byte_end,
-                        'variable': parts[3],
-                        'level': parts[4],
-                        'forecast_time': parts[5],
-                        'full_line': line
-                    })
-            
-            logger.info(f"Found {len(inventory)} records in inventory")
+            inventory = [
+                {
+                    'record': int(parts[0]),
+                    'byte_start': byte_start,
+                    'byte_end': byte_end,
+                    'variable': parts[3],
+                    'level': parts[4],
+                    'forecast_time': parts[5],
+                    'full_line': line
+                }
+                for (line, parts), byte_start, byte_end in zip(rows, starts, ends)
+            ]
+            
+            logger.info("Found %s records in inventory", len(inventory))
             return inventory
             
         except requests.RequestException as e:
-            logger.error(f"Failed to fetch GRIB inventory: {e}")
+            logger.error("Failed to fetch GRIB inventory: %s", e)
             raise
         except Exception as e:
-            logger.error(f"Error parsing GRIB inventory: {e}")
+            logger.error("Error parsing GRIB inventory: %s", e)
             raise
     
     def download_grib_subset(self, grib_url: str, byte_start: int, byte_end: Optional[int]) -> bytes:
-        """Download specific bytes from GRIB2 file."""
+        """Download specific bytes from GRIB2 file, served from the local GRIB cache when present."""
+        cache_path = self._grib_cache_path(grib_url, byte_start, byte_end)
+        if cache_path is not None:
+            try:
+                with open(cache_path, 'rb') as fh:
+                    grib_data = fh.read()
+                os.utime(cache_path)  # mark as recently used for pruning
+                return grib_data
+            except OSError:
+                pass
         try:
             headers = {'Range': f'bytes={byte_start}-{byte_end}'} if byte_end else {'Range': f'bytes={byte_start}-'}
             response = self.session.get(grib_url, headers=headers, timeout=60)
             response.raise_for_status()
-            return response.content
         except requests.RequestException as e:
-            logger.error(f"Failed to download GRIB subset: {e}")
+            logger.error("Failed to download GRIB subset: %s", e)
             raise
+        if cache_path is not None:
+            self._store_grib_cache(cache_path, response.content)
+        return response.content
+    
+    def _grib_cache_path(self, grib_url: str, byte_start: int, byte_end: Optional[int]) -> Optional[str]:
+        if not self._grib_cache_dir:
+            return None
+        key = hashlib.sha1(f'{grib_url}:{byte_start}-{byte_end}'.encode()).hexdigest()
+        return os.path.join(self._grib_cache_dir, key + '.grib2')
+    
+    def _store_grib_cache(self, cache_path: str, grib_data: bytes) -> None:
+        """Write a cache entry atomically, pruning the cache once it grows past its size cap."""
+        partial_path = f'{cache_path}.{threading.get_ident()}.part'
+        try:
+            with open(partial_path, 'wb') as fh:
+                fh.write(grib_data)
+            os.replace(partial_path, cache_path)
+        except OSError as e:
+            logger.warning("Could not write GRIB cache entry %s: %s", cache_path, e)
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            return
+        
+        with self._grib_cache_lock:
+            self._grib_cache_bytes += len(grib_data)
+            if self._grib_cache_bytes <= self.config.GRIB_CACHE_MAX_BYTES:
+                return
+            # Over the cap: drop least recently used entries, then resync the tracked total
+            entries = self._grib_cache_entries()
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.config.GRIB_CACHE_MAX_BYTES:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+            self._grib_cache_bytes = total
+    
+    def _grib_cache_entries(self) -> List[Tuple[float, int, str]]:
+        """(mtime, size, path) of every file in the GRIB cache."""
+        entries = []
+        with os.scandir(self._grib_cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith('.grib2'):
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+        return entries
     
     def get_variable_info(self, variable_name: str) -> Dict[str, Any]:
         """Get display information for meteorological variables."""
@@ -209,203 +222,238 @@ class GRIBDataProcessor:
         return self.config.VARIABLE_INFO.get(variable_name, default)
     
     def load_single_variable(self, grib_url: str, idx_url: str, variable_name: str, pressure_level: Optional[int] = None) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, np.ndarray]]]:
-        """Load a single variable from the GRIB2 file using byte slicing."""
+        """Load a single variable from the GRIB2 file using byte slicing.
+
+        Successful loads are cached per (grib_url, variable, level) so repeat requests for the
+        same field (e.g. map render followed by point samples) skip the download and decode.
+        Callers must not modify the returned arrays in place.
+        """
+        key = (grib_url, variable_name, pressure_level)
+        with self._variable_lock:
+            cached = self._variable_cache.get(key)
+        if cached is not None:
+            return cached
+        result = self._load_single_variable(grib_url, idx_url, variable_name, pressure_level)
+        if result[0] is not None:
+            with self._variable_lock:
+                self._variable_cache[key] = result
+        return result
+
+    def _load_single_variable(self, grib_url: str, idx_url: str, variable_name: str, pressure_level: Optional[int] = None) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, np.ndarray]]]:
+        """Download and decode one GRIB2 message."""
         level_msg = f" at {pressure_level}mb" if pressure_level and pressure_level > 0 else " at surface" if pressure_level == 0 else ""
-        logger.info(f"Loading single variable: {variable_name}{level_msg}")
+        logger.info("Loading single variable: %s%s", variable_name, level_msg)
         
-        inventory = self.get_grib_inventory(idx_url)
+        by_variable = self.get_inventory_by_variable(idx_url)
+        matching_vars = by_variable.get(variable_name, [])
         
-        # Find the specific variable
+        # Find the specific variable among its own records only
         target_record = None
-        for record in inventory:
-            if record['variable'] == variable_name:
-                # For 3DRTMA data, check pressure level if specified
-                if pressure_level is not None:
-                    level_str = record['level']
-                    if pressure_level == 0:
-                        # Surface level - look for "surface" or "sfc" in level string
-                        if 'surface' in level_str.lower() or 'sfc' in level_str.lower():
-                            target_record = record
-                            break
-                    else:
-                        # Pressure level format in 3DRTMA is typically "pressure mb" 
-                        if f"{pressure_level} mb" in level_str or f"{pressure_level}mb" in level_str:
-                            target_record = record
-                            break
+        for record in matching_vars:
+            # For 3DRTMA data, check pressure level if specified
+            if pressure_level is not None:
+                level_str = record['level']
+                if pressure_level == 0:
+                    # Surface level - look for "surface" or "sfc" in level string
+                    level_lower = level_str.lower()
+                    if 'surface' in level_lower or 'sfc' in level_lower:
+                        target_record = record
+                        break
                 else:
-                    # For RTMA data or when no pressure level specified, take first match
-                    target_record = record
-                    break
+                    # Pressure level format in 3DRTMA is typically "pressure mb" 
+                    if f"{pressure_level} mb" in level_str or f"{pressure_level}mb" in level_str:
+                        target_record = record
+                        break
+            else:
+                # For RTMA data or when no pressure level specified, take first match
+                target_record = record
+                break
         
         if target_record is None:
             level_msg = f" at {pressure_level}mb" if pressure_level and pressure_level > 0 else " at surface" if pressure_level == 0 else ""
-            logger.error(f"Variable {variable_name}{level_msg} not found in inventory")
+            logger.error("Variable %s%s not found in inventory", variable_name, level_msg)
             
             # Log available records for debugging
             if pressure_level is not None:
-                matching_vars = [r for r in inventory if r['variable'] == variable_name]
                 if matching_vars:
                     available_levels = [r['level'] for r in matching_vars]
-                    logger.info(f"Available levels for {variable_name}: {available_levels}")
+                    logger.info("Available levels for %s: %s", variable_name, available_levels)
                 else:
-                    available_vars = list(set(r['variable'] for r in inventory))
-                    logger.info(f"Variable {variable_name} not found. Available variables: {available_vars[:10]}...")
+                    available_vars = list(by_variable)
+                    logger.info("Variable %s not found. Available variables: %s...", variable_name, available_vars[:10])
             
             return None, None
         
         try:
-            logger.info(f"Downloading {variable_name} data...")
+            logger.info("Downloading %s data...", variable_name)
 
             # Download the specific record
             try:
                 grib_data = self.download_grib_subset(grib_url, target_record['byte_start'], target_record['byte_end'])
             except Exception as e_sub:
-                logger.warning(f'Byte-range download failed ({e_sub}), attempting full-file download as fallback')
+                logger.warning('Byte-range download failed (%s), attempting full-file download as fallback', e_sub)
                 try:
                     # Download full file as a fallback
                     resp = self.session.get(grib_url, timeout=120)
                     resp.raise_for_status()
-                    grib_data = resp.content
+                    end = target_record['byte_end']
+                    grib_data = resp.content[target_record['byte_start']:end + 1 if end else None]
                 except Exception as e_full:
-                    logger.error(f'Full file download failed: {e_full}')
+                    logger.error('Full file download failed: %s', e_full)
                     raise
             
-            # Process with temporary file
-            with tempfile.NamedTemporaryFile(suffix='.grb2', delete=False) as temp_file:
-                temp_file.write(grib_data)
-                temp_file_path = temp_file.name
+            values, coords = self._decode_grib_message(grib_data)
+            var_data = xr.DataArray(values, dims=('y', 'x'))
             
-            try:
-                # Read with xarray/cfgrib
-                ds = xr.open_dataset(temp_file_path, engine='cfgrib')
-                
-                data_vars = list(ds.data_vars)
-                if data_vars:
-                    var_data = ds[data_vars[0]]
-                    
-                    # Extract coordinates
-                    coords = self._extract_coordinates(ds)
-                    
-                    # Get variable info and convert units
-                    var_info = self.get_variable_info(variable_name)
-                    converted_data = self._convert_units(var_data, var_info)
-                    
-                    variable_data = {
-                        'data': converted_data,
-                        'info': var_info,
-                        'raw_data': var_data
-                    }
-                    
-                    logger.info(f"  {variable_name}: {var_info['name']} ({var_info['units']}) - "
-                              f"Range: {float(converted_data.min()):.2f} to {float(converted_data.max()):.2f}")
-                    
-                    return variable_data, coords
-                
-            finally:
-                # Clean up temporary file
-                if os.path.exists(temp_file_path):
-                    os.remove(temp_file_path)
+            # Get variable info and convert units
+            var_info = self.get_variable_info(variable_name)
+            converted_data = self._convert_units(var_data, var_info)
+            
+            variable_data = {
+                'data': converted_data,
+                'info': var_info,
+                'raw_data': var_data
+            }
+            
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("  %s: %s (%s) - Range: %.2f to %.2f", variable_name, var_info['name'],
+                            var_info['units'], float(converted_data.min()), float(converted_data.max()))
+            
+            return variable_data, coords
                     
         except Exception as e:
             error_msg = str(e)
             if "JPEG support not enabled" in error_msg or "Functionality not enabled" in error_msg:
-                logger.error(f"Error loading {variable_name}: JPEG compression not supported. "
-                           f"3DRTMA data requires eccodes with JPEG support. Error: {e}")
+                logger.error("Error loading %s: JPEG compression not supported. "
+                             "3DRTMA data requires eccodes with JPEG support. Error: %s", variable_name, e)
             else:
-                logger.error(f"Error loading {variable_name}: {e}")
+                logger.error("Error loading %s: %s", variable_name, e)
             return None, None
-        
-        return None, None
 
     def get_available_variables(self, idx_url: str) -> List[str]:
         """Get list of available variables from the GRIB index."""
         try:
-            inventory = self.get_grib_inventory(idx_url)
-            variables = list(set(record['variable'] for record in inventory))
-            return sorted(variables)
+            return sorted(self.get_inventory_by_variable(idx_url))
         except Exception as e:
-            logger.error(f"Error getting available variables: {e}")
+            logger.error("Error getting available variables: %s", e)
             return []
 
     def load_all_variables(self, grib_url: str, idx_url: str) -> Tuple[Dict[str, Any], Optional[Dict[str, np.ndarray]]]:
         """Load all variables from the GRIB2 file."""
         logger.info("Starting variable loading process")
         
-        inventory = self.get_grib_inventory(idx_url)
+        variables_by_name = self.get_inventory_by_variable(idx_url)
         
-        # Group by variable name
-        variables_by_name = {}
-        for record in inventory:
-            var_name = record['variable']
-            if var_name not in variables_by_name:
-                variables_by_name[var_name] = []
-            variables_by_name[var_name].append(record)
-        
-        logger.info(f"Available variables: {list(variables_by_name.keys())}")
+        logger.info("Available variables: %s", list(variables_by_name.keys()))
         
         all_data = {}
         coords = None
         
+        # Messages that sit close together in the file share one bounded Range GET. The GETs
+        # are latency bound, so issue them all up front over the pooled session; decoding
+        # below stays on this thread
+        spans = self._coalesce_ranges([records[0] for records in variables_by_name.values()])
+        downloads = {}
+        workers = max(1, min(self.config.HTTP_POOL_SIZE, len(spans)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for span_start, span_end, members in spans:
+                future = pool.submit(self.download_grib_subset, grib_url, span_start, span_end)
+                for record in members:
+                    downloads[record['variable']] = (future, span_start, record)
+        
         for var_name, records in variables_by_name.items():
             try:
-                record = records[0]  # Use first record for each variable
-                logger.info(f"Loading {var_name}...")
+                logger.info("Loading %s...", var_name)
                 
-                # Download the specific record
-                grib_data = self.download_grib_subset(grib_url, record['byte_start'], record['byte_end'])
+                future, span_start, record = downloads[var_name]
+                grib_data = self._span_slice(future.result(), span_start, record)
                 
-                # Process with temporary file
-                with tempfile.NamedTemporaryFile(suffix='.grb2', delete=False) as temp_file:
-                    temp_file.write(grib_data)
-                    temp_file_path = temp_file.name
+                values, var_coords = self._decode_grib_message(grib_data)
+                var_data = xr.DataArray(values, dims=('y', 'x'))
                 
-                try:
-                    # Read with xarray/cfgrib
-                    ds = xr.open_dataset(temp_file_path, engine='cfgrib')
-                    
-                    data_vars = list(ds.data_vars)
-                    if data_vars:
-                        var_data = ds[data_vars[0]]
-                        
-                        # Store coordinates from first successful load
-                        if coords is None:
-                            coords = self._extract_coordinates(ds)
-                        
-                        # Get variable info and convert units
-                        var_info = self.get_variable_info(var_name)
-                        converted_data = self._convert_units(var_data, var_info)
-                        
-                        all_data[var_name] = {
-                            'data': converted_data,
-                            'info': var_info,
-                            'raw_data': var_data,
-                            'records': records
-                        }
-                        
-                        logger.info(f"  {var_name}: {var_info['name']} ({var_info['units']}) - "
-                                  f"Range: {float(converted_data.min()):.2f} to {float(converted_data.max()):.2f}")
+                # Store coordinates from first successful load
+                if coords is None:
+                    coords = var_coords
+                
+                # Get variable info and convert units
+                var_info = self.get_variable_info(var_name)
+                converted_data = self._convert_units(var_data, var_info)
+                
+                all_data[var_name] = {
+                    'data': converted_data,
+                    'info': var_info,
+                    'raw_data': var_data,
+                    'records': records
+                }
                 
-                finally:
-                    # Clean up temporary file
-                    if os.path.exists(temp_file_path):
-                        os.remove(temp_file_path)
+                if logger.isEnabledFor(logging.INFO):
+                    logger.info("  %s: %s (%s) - Range: %.2f to %.2f", var_name, var_info['name'],
+                                var_info['units'], float(converted_data.min()), float(converted_data.max()))
                         
             except Exception as e:
-                logger.warning(f"Error loading {var_name}: {e}")
+                logger.warning("Error loading %s: %s", var_name, e)
                 continue
         
         if not all_data:
             logger.error("No variables could be loaded successfully")
             return {}, None
             
-        logger.info(f"Successfully loaded {len(all_data)} variables")
+        logger.info("Successfully loaded %s variables", len(all_data))
         return all_data, coords
     
-    def _extract_coordinates(self, ds: xr.Dataset) -> Dict[str, np.ndarray]:
-        """Extract and process coordinate grids from dataset."""
-        lats = ds.latitude.values
-        lons = ds.longitude.values
-        
+    def _coalesce_ranges(self, records: List[Dict[str, Any]]) -> List[Tuple[int, Optional[int], List[Dict[str, Any]]]]:
+        """Merge inventory records into (start, end, records) Range spans.
+
+        A record joins the previous span when the gap between them is at most
+        RANGE_COALESCE_GAP bytes and the span stays within RANGE_COALESCE_MAX_BYTES.
+        An end of None runs to the end of the file; since its size is unknown, such a
+        record only joins a span when it starts within RANGE_COALESCE_MAX_BYTES of it.
+        """
+        max_bytes = self.config.RANGE_COALESCE_MAX_BYTES
+        spans = []
+        for record in sorted(records, key=lambda r: r['byte_start']):
+            start, end = record['byte_start'], record['byte_end']
+            if spans:
+                span_start, span_end, members = spans[-1]
+                fits = start - span_start < max_bytes if end is None else end - span_start + 1 <= max_bytes
+                if span_end is not None and start - span_end - 1 <= self.config.RANGE_COALESCE_GAP and fits:
+                    spans[-1] = (span_start, end if end is None else max(end, span_end), members + [record])
+                    continue
+            spans.append((start, end, [record]))
+        return spans
+    
+    @staticmethod
+    def _span_slice(span_data: bytes, span_start: int, record: Dict[str, Any]) -> bytes:
+        """Cut one record's bytes back out of a span downloaded from span_start."""
+        end = record['byte_end']
+        return span_data[record['byte_start'] - span_start:end - span_start + 1 if end is not None else None]
+    
+    def _decode_grib_message(self, buf: bytes) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """Decode one GRIB2 message in memory into its (Nj, Ni) values and coordinate grids.
+
+        Coordinates are only computed the first time a grid definition is seen.
+        """
+        gid = eccodes.codes_new_from_message(bytes(buf))
+        try:
+            shape = (eccodes.codes_get(gid, 'Nj'), eccodes.codes_get(gid, 'Ni'))
+            values = eccodes.codes_get_array(gid, 'values')
+            if eccodes.codes_get(gid, 'bitmapPresent'):
+                values[values == eccodes.codes_get(gid, 'missingValue')] = np.nan
+            grid_key = eccodes.codes_get_string(gid, 'md5GridSection')
+            with self._coord_lock:
+                coords = self._coord_cache.get(grid_key)
+            if coords is None:
+                lats = eccodes.codes_get_array(gid, 'latitudes').reshape(shape)
+                lons = eccodes.codes_get_array(gid, 'longitudes').reshape(shape)
+                coords = self._extract_coordinates(lats, lons)
+                with self._coord_lock:
+                    self._coord_cache[grid_key] = coords
+        finally:
+            eccodes.codes_release(gid)
+        return values.reshape(shape), coords
+    
+    def _extract_coordinates(self, lats: np.ndarray, lons: np.ndarray) -> Dict[str, np.ndarray]:
+        """Process latitude/longitude arrays into map coordinate grids."""
         # Convert to regular grid if needed
         if len(lats.shape) == 1:
             lon_grid, lat_grid = np.meshgrid(lons, lats)
@@ -416,14 +464,24 @@ class GRIBDataProcessor:
         if lon_grid.max() > 180:
             lon_grid = np.where(lon_grid > 180, lon_grid - 360, lon_grid)
         
-        return {'lat_grid': lat_grid, 'lon_grid': lon_grid}
+        # float32 is ~1 m of precision at these latitudes and halves every contour/resample pass
+        lat_grid = lat_grid.astype(np.float32, copy=False)
+        lon_grid = lon_grid.astype(np.float32, copy=False)
+        
+        # Overlay bounds [[south, west], [north, east]], reduced once here rather than per overlay
+        bounds = [[float(lat_grid.min()), float(lon_grid.min())],
+                  [float(lat_grid.max()), float(lon_grid.max())]]
+        
+        return {'lat_grid': lat_grid, 'lon_grid': lon_grid, 'bounds': bounds}
     
     def _convert_units(self, var_data: xr.DataArray, var_info: Dict[str, Any]) -> xr.DataArray:
         """Convert variable data to appropriate units."""
-        converted_data = var_data * var_info['multiplier']
+        # One float32 copy (raw_data keeps the original), then scale/shift it in place
+        arr = var_data.values.astype(np.float32)
+        np.multiply(arr, var_info['multiplier'], out=arr)
         if 'offset' in var_info:
-            converted_data += var_info['offset']
-        return converted_data
+            np.add(arr, var_info['offset'], out=arr)
+        return xr.DataArray(arr, coords=var_data.coords, dims=var_data.dims)
 
 
 class WeatherMapRenderer:
@@ -434,38 +492,74 @@ class WeatherMapRenderer:
         
     def create_contour_overlay(self, lon_grid: np.ndarray, lat_grid: np.ndarray, 
                              data: np.ndarray, levels: Optional[np.ndarray] = None, 
-                             cmap: str = 'YlOrRd', opacity: float = 0.6) -> str:
-        """Create a contour overlay as a raster image for Folium."""
-        
-        # Create figure with transparent background
-        fig, ax = plt.subplots(figsize=self.config.FIGURE_SIZE, dpi=self.config.FIGURE_DPI)
-        fig.patch.set_alpha(0)
-        ax.set_facecolor('none')
+                             cmap: str = 'YlOrRd', opacity: float = 0.6,
+                             return_bytes: bool = False):
+        """Create a filled-contour overlay as a raster image for Folium.
+
+        Grid points are colored by contour band through a colormap lookup table and mapped
+        straight onto a lat/lon raster covering the data bounds, without a Matplotlib figure.
+        Returns the PNG base64-encoded, or as raw bytes when return_bytes is set.
+        """
+        # Rasterizing is memory-bound at RTMA grid sizes; these are no-ops for the float32 arrays
+        # the processor produces and only copy float64 input
+        data = np.asarray(data, dtype=np.float32)
+        lon_grid = np.asarray(lon_grid, dtype=np.float32)
+        lat_grid = np.asarray(lat_grid, dtype=np.float32)
         
-        # Create contour plot
         if levels is None:
             levels = np.linspace(np.nanmin(data), np.nanmax(data), self.config.CONTOUR_LEVELS)
-        
-        contour = ax.contourf(lon_grid, lat_grid, data, levels=levels, cmap=cmap, alpha=opacity)
-        
-        # Remove axes and margins
-        ax.set_xlim(lon_grid.min(), lon_grid.max())
-        ax.set_ylim(lat_grid.min(), lat_grid.max())
-        ax.axis('off')
-        plt.tight_layout(pad=0)
-        
-        # Save to bytes
+        levels = np.asarray(levels, dtype=np.float32)
+        n_bands = len(levels) - 1
+        
+        # Fill band of each grid point, 1-based like contourf's layers; 0 (outside the levels
+        # or missing) stays transparent
+        inside = (data >= levels[0]) & (data <= levels[-1])
+        band = np.minimum(np.searchsorted(levels, data, side='right'), n_bands)
+        
+        # Band colors sampled at each band's midpoint, with the overlay opacity baked in
+        span = float(levels[-1] - levels[0]) or 1.0
+        mids = (levels[:-1] + levels[1:]) / 2
+        colors = _colormap_lut(cmap)[np.clip(((mids - levels[0]) / span * 255).astype(int), 0, 255)]
+        colors[:, 3] = round(opacity * 255)
+        palette = np.vstack([np.zeros((1, 4), dtype=np.uint8), colors])
+        
+        # Forward-map every grid point onto a lat/lon raster spanning the overlay bounds
+        width = int(self.config.FIGURE_SIZE[0] * self.config.FIGURE_DPI)
+        height = int(self.config.FIGURE_SIZE[1] * self.config.FIGURE_DPI)
+        lon_min, lon_max = float(lon_grid.min()), float(lon_grid.max())
+        lat_min, lat_max = float(lat_grid.min()), float(lat_grid.max())
+        x = np.rint((lon_grid - lon_min) * ((width - 1) / ((lon_max - lon_min) or 1.0))).astype(np.intp)
+        y = np.rint((lat_max - lat_grid) * ((height - 1) / ((lat_max - lat_min) or 1.0))).astype(np.intp)
+        raster = np.zeros((height, width), dtype=np.uint8 if n_bands < 256 else np.uint16)
+        raster[y[inside], x[inside]] = band[inside]
+        # Pixels that received any grid point, masked or not; only the rest are gaps
+        hit = np.zeros((height, width), dtype=bool)
+        hit[y, x] = True
+        
+        # Degree spacing of a projected grid varies across the domain; close the single-pixel
+        # gaps left where grid points are sparser than raster pixels from a neighbouring band
+        for dst, src in ((np.s_[:, 1:], np.s_[:, :-1]), (np.s_[:, :-1], np.s_[:, 1:]),
+                         (np.s_[1:], np.s_[:-1]), (np.s_[:-1], np.s_[1:])):
+            target, target_hit = raster[dst], hit[dst]
+            gap = ~target_hit & (raster[src] != 0)
+            target[gap] = raster[src][gap]
+            target_hit |= gap
+        
+        if self.config.OVERLAY_PALETTE_COLORS and n_bands < 256:
+            img = Image.fromarray(raster)
+            img.putpalette(palette.tobytes(), rawmode='RGBA')
+        else:
+            img = Image.fromarray(palette[raster], 'RGBA')
         buf = io.BytesIO()
-        plt.savefig(buf, format='png', transparent=True, bbox_inches='tight', pad_inches=0, 
-                   dpi=self.config.FIGURE_DPI)
-        buf.seek(0)
-        plt.close(fig)
+        img.save(buf, format='PNG')
         
-        # Convert to base64
-        img_data = base64.b64encode(buf.getvalue()).decode()
+        png_bytes = buf.getvalue()
         buf.close()
+        if return_bytes:
+            return png_bytes
         
-        return img_data
+        # Convert to base64
+        return base64.b64encode(png_bytes).decode()
     
     def create_single_variable_map(self, variable_data: Dict[str, Any], 
                                  coords: Dict[str, np.ndarray], 
@@ -492,8 +586,7 @@ class WeatherMapRenderer:
         self._add_base_layers(m)
         
         # Get bounds for image overlays
-        bounds = [[float(lat_grid.min()), float(lon_grid.min())], 
-                  [float(lat_grid.max()), float(lon_grid.max())]]
+        bounds = coords['bounds']
         
         # Create current variable overlay
         data = variable_data['data']
@@ -504,7 +597,7 @@ class WeatherMapRenderer:
         levels = np.linspace(vmin, vmax, self.config.CONTOUR_LEVELS)
         
         # Create contour overlay
-        logger.info(f"Creating contour overlay for {variable_name}...")
+        logger.info("Creating contour overlay for %s...", variable_name)
         img_data = self.create_contour_overlay(lon_grid, lat_grid, data, 
                                              levels=levels, cmap=var_info['cmap'])
         
@@ -593,8 +686,7 @@ class WeatherMapRenderer:
         self._add_base_layers(m)
         
         # Get bounds for image overlays
-        bounds = [[float(lat_grid.min()), float(lon_grid.min())], 
-                  [float(lat_grid.max()), float(lon_grid.max())]]
+        bounds = coords['bounds']
         
         # Create image overlays for each variable
         variable_overlays = {}
@@ -609,7 +701,7 @@ class WeatherMapRenderer:
             levels = np.linspace(vmin, vmax, self.config.CONTOUR_LEVELS)
             
             # Create contour overlay
-            logger.info(f"Creating contour overlay for {var_name}...")
+            logger.info("Creating contour overlay for %s...", var_name)
             img_data = self.create_contour_overlay(lon_grid, lat_grid, data, 
                                                  levels=levels, cmap=var_info['cmap'])
             
@@ -1244,7 +1336,7 @@ class WeatherMapGenerator:
                 
             return levels
         except Exception as e:
-            logger.error(f"Error getting pressure levels: {e}")
+            logger.error("Error getting pressure levels: %s", e)
             return []
     
     def get_filtered_variables(self, date: str, hour: int, data_source: str) -> List[str]:
@@ -1265,7 +1357,7 @@ class WeatherMapGenerator:
                 return all_variables
                 
         except Exception as e:
-            logger.error(f"Error getting filtered variables: {e}")
+            logger.error("Error getting filtered variables: %s", e)
             return []
     
     def get_variables_for_pressure_level(self, date: str, hour: int, data_source: str, pressure_level: int) -> List[str]:
@@ -1301,19 +1393,19 @@ class WeatherMapGenerator:
             return sorted(list(available_variables))
             
         except Exception as e:
-            logger.error(f"Error getting variables for pressure level {pressure_level}: {e}")
+            logger.error("Error getting variables for pressure level %s: %s", pressure_level, e)
             return []
     
     def create_single_variable_weather_map(self, date: str, hour: int, output_path: str, variable_name: str = 'TMP', data_source: str = None, pressure_level: Optional[int] = None) -> bool:
         """Create weather map for a single variable (faster than loading all variables)."""
         try:
             level_msg = f" at {pressure_level}mb" if pressure_level else ""
-            logger.info(f"Creating single variable weather map for {date} {hour:02d}Z, variable: {variable_name}{level_msg}, source: {data_source or 'RTMA'}")
+            logger.info("Creating single variable weather map for %s %02dZ, variable: %s%s, source: %s", date, hour, variable_name, level_msg, data_source or 'RTMA')
             
             # Generate URLs
             grib_url, idx_url = self.generate_urls(date, hour, data_source)
-            logger.info(f"GRIB URL: {grib_url}")
-            logger.info(f"Index URL: {idx_url}")
+            logger.info("GRIB URL: %s", grib_url)
+            logger.info("Index URL: %s", idx_url)
             
             # Get available variables first
             available_variables = self.get_filtered_variables(date, hour, data_source or self.config.DEFAULT_DATA_SOURCE)
@@ -1323,14 +1415,14 @@ class WeatherMapGenerator:
             
             # Use first available variable if requested one not found
             if variable_name not in available_variables:
-                logger.warning(f"Variable {variable_name} not found, using {available_variables[0]}")
+                logger.warning("Variable %s not found, using %s", variable_name, available_variables[0])
                 variable_name = available_variables[0]
             
             # Load single variable data
             variable_data, coords = self.processor.load_single_variable(grib_url, idx_url, variable_name, pressure_level)
             
             if not variable_data or coords is None:
-                logger.error(f"Failed to load variable {variable_name}")
+                logger.error("Failed to load variable %s", variable_name)
                 return False
             
             # Create map
@@ -1343,20 +1435,20 @@ class WeatherMapGenerator:
             output_path.parent.mkdir(parents=True, exist_ok=True)
             weather_map.save(str(output_path))
             
-            logger.info(f"Single variable weather map saved to: {output_path}")
-            logger.info(f"Variable: {variable_data['info']['name']} ({variable_name})")
+            logger.info("Single variable weather map saved to: %s", output_path)
+            logger.info("Variable: %s (%s)", variable_data['info']['name'], variable_name)
             
             return True
             
         except Exception as e:
-            logger.error(f"Failed to create single variable weather map: {e}")
+            logger.error("Failed to create single variable weather map: %s", e)
             return False
     
     def get_variable_data_json(self, date: str, hour: int, variable_name: str, data_source: str = None, pressure_level: Optional[int] = None) -> Dict[str, Any]:
         """Get variable data as JSON for AJAX requests."""
         try:
             level_msg = f" at {pressure_level}mb" if pressure_level else ""
-            logger.info(f"get_variable_data_json called with date={date}, hour={hour}, variable={variable_name}{level_msg}, source={data_source or 'RTMA'}")
+            logger.info("get_variable_data_json called with date=%s, hour=%s, variable=%s%s, source=%s", date, hour, variable_name, level_msg, data_source or 'RTMA')
             
             # Validate date format
             if not date or len(date) != 8 or not date.isdigit():
@@ -1366,7 +1458,7 @@ class WeatherMapGenerator:
             
             # Generate URLs
             grib_url, idx_url = self.generate_urls(date, hour, data_source)
-            logger.info(f"Generated URLs - GRIB: {grib_url}, IDX: {idx_url}")
+            logger.info("Generated URLs - GRIB: %s, IDX: %s", grib_url, idx_url)
             
             # Load single variable data
             variable_data, coords = self.processor.load_single_variable(grib_url, idx_url, variable_name, pressure_level)
@@ -1391,18 +1483,16 @@ class WeatherMapGenerator:
             vmin, vmax = float(data.min()), float(data.max())
             levels = np.linspace(vmin, vmax, self.config.CONTOUR_LEVELS)
             
-            logger.info(f"Data range for {variable_name}: {vmin:.2f} to {vmax:.2f}")
+            logger.info("Data range for %s: %.2f to %.2f", variable_name, vmin, vmax)
             
             # Create contour overlay
             img_data = self.renderer.create_contour_overlay(
                 lon_grid, lat_grid, data, levels=levels, cmap=var_info['cmap']
             )
             
-            # Prepare bounds
-            bounds = [[float(lat_grid.min()), float(lon_grid.min())], 
-                      [float(lat_grid.max()), float(lon_grid.max())]]
+            bounds = coords['bounds']
             
-            logger.info(f"Successfully created overlay for {variable_name}")
+            logger.info("Successfully created overlay for %s", variable_name)
             
             return {
                 'success': True,
@@ -1418,18 +1508,18 @@ class WeatherMapGenerator:
             }
             
         except Exception as e:
-            logger.error(f"Failed to get variable data: {e}", exc_info=True)
+            logger.error("Failed to get variable data: %s", e, exc_info=True)
             return {'success': False, 'error': str(e)}
 
     def create_weather_map(self, date: str, hour: int, output_path: str, data_source: str = None) -> bool:
         """Create weather map for specified date and hour."""
         try:
-            logger.info(f"Creating weather map for {date} {hour:02d}Z, source: {data_source or 'RTMA'}")
+            logger.info("Creating weather map for %s %02dZ, source: %s", date, hour, data_source or 'RTMA')
             
             # Generate URLs
             grib_url, idx_url = self.generate_urls(date, hour, data_source)
-            logger.info(f"GRIB URL: {grib_url}")
-            logger.info(f"Index URL: {idx_url}")
+            logger.info("GRIB URL: %s", grib_url)
+            logger.info("Index URL: %s", idx_url)
             
             # Load data
             all_data, coords = self.processor.load_all_variables(grib_url, idx_url)
@@ -1446,13 +1536,13 @@ class WeatherMapGenerator:
             output_path.parent.mkdir(parents=True, exist_ok=True)
             weather_map.save(str(output_path))
             
-            logger.info(f"Weather map saved to: {output_path}")
-            logger.info(f"Successfully loaded {len(all_data)} variables")
+            logger.info("Weather map saved to: %s", output_path)
+            logger.info("Successfully loaded %s variables", len(all_data))
             
             return True
             
         except Exception as e:
-            logger.error(f"Failed to create weather map: {e}")
+            logger.error("Failed to create weather map: %s", e)
             return False
 
 
@@ -1464,13 +1554,13 @@ def parse_arguments() -> argparse.Namespace:
         epilog="""
 Examples:
   # Generate map for today at 12Z
-  python weather_map_generator.py --hour 12
+  python weather_map.py --hour 12
   
   # Generate map for specific date
-  python weather_map_generator.py --date 20250801 --hour 18 --output /path/to/map.html
+  python weather_map.py --date 20250801 --hour 18 --output /path/to/map.html
   
   # Use verbose logging
-  python weather_map_generator.py --date 20250801 --hour 12 --verbose
+  python weather_map.py --date 20250801 --hour 12 --verbose
         """
     )
     
@@ -1520,7 +1610,7 @@ def main():
     try:
         datetime.strptime(args.date, '%Y%m%d')
     except ValueError:
-        logger.error(f"Invalid date format: {args.date}. Use YYYYMMDD format.")
+        logger.error("Invalid date format: %s. Use YYYYMMDD format.", args.date)
         sys.exit(1)
     
     # Create weather map generator